@@ -0,0 +1,239 @@
+"""
+Reproducible HardAI performance numbers on a fixed corpus of positions
+(assets/bench/positions.json: opening, midgame, tactical and near-full boards).
+
+    python bench.py run [--depth 4] [--time 0.5] [--only midgame] [--out result.json]
+    python bench.py compare old.json new.json [--threshold 10]
+
+run:      every position is searched at a fixed depth and for a fixed time, recording
+          nodes, nodes/s, TT hit rate, time to each depth and the chosen move; then
+          evaluate(), generate_candidate_moves() and Board.check_winner_pure() are timed.
+          Prints a table and writes the results as JSON (--out, "-" for stdout).
+compare:  per-position and total differences between two run results. Slowdowns beyond
+          the threshold (percent) and changed fixed-depth moves are flagged; the exit
+          status is 1 when anything was flagged.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import BASE_DIR, Board, HardAI, np
+
+POSITIONS_FILE = os.path.join(BASE_DIR, "assets", "bench", "positions.json")
+
+
+def load_positions(path, only=None):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    positions = []
+    for pos in data["positions"]:
+        if only and only not in (pos["category"], pos["name"]):
+            continue
+        board = Board(data["size"], data["win_condition"], data["allow_blocked"])
+        for r, row in enumerate(pos["board"]):
+            for c, v in enumerate(row):
+                if v in "XO":
+                    board.place(r, c, v)
+        x = sum(row.count("X") for row in pos["board"])
+        o = sum(row.count("O") for row in pos["board"])
+        positions.append((pos, board, "X" if x == o else "O"))
+    return positions
+
+
+def make_ai(board, char, args, time_limit, max_depth):
+    ai = HardAI(board, tt_size_mb=args.tt, use_numpy=not args.no_numpy, time_limit=time_limit)
+    ai.ai_char = char
+    ai.opp_char = "O" if char == "X" else "X"
+    ai.max_depth = max_depth
+    return ai
+
+
+def run_search(board, char, args, time_limit, max_depth):
+    """One get_move on a fresh engine (empty TT) and its statistics."""
+    ai = make_ai(board, char, args, time_limit, max_depth)
+    t = time.perf_counter()
+    mv = ai.get_move()
+    elapsed = time.perf_counter() - t
+    return {
+        "move": list(mv) if mv else None,
+        "seconds": round(elapsed, 5),
+        "depth": ai.searched_depth,
+        "score": ai.searched_score,
+        "nodes": ai.searched_nodes,
+        "nps": round(ai.searched_nodes / elapsed) if elapsed > 0 else 0,
+        "tt_probes": ai.tt.probes,
+        "tt_hit_rate": round(ai.tt.hits / ai.tt.probes, 4) if ai.tt.probes else 0.0,
+        # empty when the move came from the threat solver or an immediate win/block
+        "time_to_depth": [{"depth": d, "seconds": round(s, 5), "nodes": n} for d, s, n, _, _ in ai.search_log],
+    }
+
+
+def time_call(fn, min_seconds):
+    """Microseconds per call, repeating fn until min_seconds have passed."""
+    calls = 0
+    t = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - t
+        if elapsed >= min_seconds:
+            return round(elapsed / calls * 1e6, 2)
+
+
+def run_micro(board, char, args):
+    ai = make_ai(board, char, args, None, 1)
+    ai.compute_zobrist()
+    ai.evaluator.sync()
+    return {
+        "evaluate": time_call(ai.evaluate, args.micro),
+        "generate_candidate_moves": time_call(ai.generate_candidate_moves, args.micro),
+        "check_winner_pure": time_call(lambda: board.check_winner_pure(board.grid), args.micro),
+    }
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def cmd_run(args):
+    positions = load_positions(args.positions, args.only)
+    results = []
+    print(f"{'position':18}{'move':>9}{'ms':>9}{'nodes':>9}{'nodes/s':>9}{'tt hit':>8}"
+          f"{'| depth':>8}{'move':>9}{'nodes/s':>9}", file=sys.stderr)
+    for pos, board, char in positions:
+        fixed_depth = run_search(board, char, args, 1e9, args.depth)
+        fixed_time = run_search(board, char, args, args.time, args.max_depth)
+        micro = run_micro(board, char, args)
+        results.append({
+            "name": pos["name"],
+            "category": pos["category"],
+            "to_move": char,
+            "stones": board.stone_count,
+            "fixed_depth": fixed_depth,
+            "fixed_time": fixed_time,
+            "micro_us": micro,
+        })
+        print(f"{pos['name']:18}{str(tuple(fixed_depth['move'] or ())):>9}{1000 * fixed_depth['seconds']:>9.1f}"
+              f"{fixed_depth['nodes']:>9}{fixed_depth['nps']:>9}{100 * fixed_depth['tt_hit_rate']:>7.1f}%"
+              f"{fixed_time['depth']:>8}{str(tuple(fixed_time['move'] or ())):>9}{fixed_time['nps']:>9}",
+              file=sys.stderr)
+    totals = {
+        "fixed_depth_seconds": round(sum(r["fixed_depth"]["seconds"] for r in results), 5),
+        "fixed_depth_nodes": sum(r["fixed_depth"]["nodes"] for r in results),
+        "fixed_time_nodes": sum(r["fixed_time"]["nodes"] for r in results),
+        "fixed_time_avg_depth": round(sum(r["fixed_time"]["depth"] for r in results) / max(1, len(results)), 3),
+        "micro_us": {k: round(sum(r["micro_us"][k] for r in results), 2)
+                     for k in ("evaluate", "generate_candidate_moves", "check_winner_pure")},
+    }
+    seconds = sum(r["fixed_time"]["seconds"] for r in results)
+    totals["fixed_time_nps"] = round(totals["fixed_time_nodes"] / seconds) if seconds else 0
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np is not None and not args.no_numpy,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "config": {"depth": args.depth, "time": args.time, "max_depth": args.max_depth, "tt_mb": args.tt,
+                   "positions": os.path.basename(args.positions), "only": args.only},
+        "positions": results,
+        "totals": totals,
+    }
+    print(f"total fixed-depth {totals['fixed_depth_seconds']:.3f} s, {totals['fixed_depth_nodes']} nodes; "
+          f"fixed-time {totals['fixed_time_nps']} nodes/s, average depth {totals['fixed_time_avg_depth']}",
+          file=sys.stderr)
+    text = json.dumps(report, indent=1)
+    if args.out == "-":
+        print(text)
+    elif args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Wrote {args.out}", file=sys.stderr)
+
+
+def change(old, new):
+    """Relative change in percent (positive = larger)."""
+    if not old:
+        return 0.0
+    return 100.0 * (new - old) / old
+
+
+def cmd_compare(args):
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    before = {r["name"]: r for r in old["positions"]}
+    flagged = 0
+    print(f"{old['meta'].get('revision')} -> {new['meta'].get('revision')}")
+    print(f"{'position':18}{'depth ms':>10}{'nodes':>9}{'nps(t)':>9}{'depth(t)':>10}  notes")
+    for r in new["positions"]:
+        o = before.get(r["name"])
+        if o is None:
+            print(f"{r['name']:18}  (new position)")
+            continue
+        d_time = change(o["fixed_depth"]["seconds"], r["fixed_depth"]["seconds"])
+        d_nodes = change(o["fixed_depth"]["nodes"], r["fixed_depth"]["nodes"])
+        d_nps = change(o["fixed_time"]["nps"], r["fixed_time"]["nps"])
+        d_depth = r["fixed_time"]["depth"] - o["fixed_time"]["depth"]
+        notes = []
+        if r["fixed_depth"]["move"] != o["fixed_depth"]["move"]:
+            notes.append(f"move {o['fixed_depth']['move']} -> {r['fixed_depth']['move']}")
+        if d_time > args.threshold:
+            notes.append("slower")
+        if d_nps < -args.threshold:
+            notes.append("fewer nodes/s")
+        for k, v in r["micro_us"].items():
+            if change(o["micro_us"].get(k, 0), v) > args.threshold:
+                notes.append(f"{k} {o['micro_us'][k]:.1f} -> {v:.1f} us")
+        flagged += bool(notes)
+        print(f"{r['name']:18}{d_time:>+9.1f}%{d_nodes:>+8.1f}%{d_nps:>+8.1f}%{d_depth:>+10}  {'; '.join(notes)}")
+    ot, nt = old["totals"], new["totals"]
+    print(f"total fixed-depth time {change(ot['fixed_depth_seconds'], nt['fixed_depth_seconds']):+.1f}%, "
+          f"nodes {change(ot['fixed_depth_nodes'], nt['fixed_depth_nodes']):+.1f}%, "
+          f"fixed-time nodes/s {change(ot['fixed_time_nps'], nt['fixed_time_nps']):+.1f}%, "
+          f"average depth {nt['fixed_time_avg_depth'] - ot['fixed_time_avg_depth']:+.2f}")
+    for k, v in nt["micro_us"].items():
+        print(f"  {k}: {ot['micro_us'].get(k, 0):.1f} -> {v:.1f} us ({change(ot['micro_us'].get(k, 0), v):+.1f}%)")
+    return 1 if flagged else 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="HardAI benchmark on a fixed position corpus.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    run = sub.add_parser("run", help="benchmark the current tree")
+    run.add_argument("--positions", default=POSITIONS_FILE)
+    run.add_argument("--only", default=None, help="a category or position name")
+    run.add_argument("--depth", type=int, default=4, help="fixed-depth search depth")
+    run.add_argument("--time", type=float, default=0.5, help="fixed-time search, seconds per position")
+    run.add_argument("--max-depth", type=int, default=12, help="depth cap of the fixed-time search")
+    run.add_argument("--tt", type=int, default=HardAI.TT_SIZE_MB, help="transposition table MB")
+    run.add_argument("--no-numpy", action="store_true", help="use the pure Python candidate scoring")
+    run.add_argument("--micro", type=float, default=0.2, help="seconds per micro benchmark")
+    run.add_argument("--out", default=None, help="JSON output file ('-' for stdout)")
+    cmp_ = sub.add_parser("compare", help="compare two run results")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=10.0, help="percent change that gets flagged")
+    args = parser.parse_args()
+    if args.mode == "run":
+        cmd_run(args)
+    else:
+        sys.exit(cmd_compare(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,154 @@
+"""
+Build or extend the HardAI opening book (assets/book/opening.bin).
+
+    python build_book.py search   [--plies 3] [--width 5] [--time 2.0]
+    python build_book.py selfplay [--games 40] [--plies 8] [--time 0.5]
+
+search:   walks the early game tree (every plausible first move for X, then the
+          `width` best replies) and stores HardAI's move for each position where
+          O is to move, found with a longer time budget than in play.
+selfplay: plays HardAI against itself from varied openings and adds the moves of
+          the winning side for the first `plies` stones.
+Existing entries are kept: the same move gains weight, a different move only
+replaces a stored one with a higher weight.
+"""
+import argparse
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import Board, Config, HardAI, OpeningBook, BOOK_FILE, canonical_key, symmetry_maps
+
+
+def new_board():
+    return Board(Config.BOARD_SIZE, Config.WIN_CONDITION, Config.ALLOW_BLOCKED_WIN)
+
+
+def make_ai(board, char, time_limit):
+    ai = HardAI(board)
+    ai.ai_char = char
+    ai.opp_char = "O" if char == "X" else "X"
+    ai.TIME_LIMIT = time_limit
+    return ai
+
+
+def add_entry(entries, grid, move, weight):
+    """Merge (grid -> move) into entries, storing the move in canonical orientation."""
+    size = len(grid)
+    key, s = canonical_key(grid)
+    r, c = symmetry_maps(size)[0][s][move[0]][move[1]]
+    code = r * size + c
+    old = entries.get(key)
+    if old is None:
+        entries[key] = (code, weight)
+    elif old[0] == code:
+        entries[key] = (code, old[1] + weight)
+    elif weight > old[1]:
+        entries[key] = (code, weight)
+
+
+def build_from_search(entries, plies, width, time_limit):
+    board = new_board()
+    size = board.size
+    center = size // 2
+    seen = set()
+    # every first move for X near the center, up to symmetry
+    frontier = []
+    for r in range(center - 2, center + 3):
+        for c in range(center - 2, center + 3):
+            board.place(r, c, "X")
+            key = canonical_key(board.grid)[0]
+            if key not in seen:
+                seen.add(key)
+                frontier.append([(r, c)])
+            board.remove(r, c)
+    for ply in range(plies):
+        next_frontier = []
+        for moves in frontier:
+            board.reset()
+            p = "X"
+            for (r, c) in moves:
+                board.place(r, c, p)
+                p = "O" if p == "X" else "X"
+            ai = make_ai(board, "O", time_limit)
+            mv = ai.get_move()
+            if not mv:
+                continue
+            add_entry(entries, board.grid, mv, 100)
+            print(f"  {len(moves)} stones: {moves} -> {mv}")
+            if ply + 1 == plies:
+                continue
+            board.place(mv[0], mv[1], "O")
+            # the replies X is most likely to play
+            replier = make_ai(board, "X", time_limit)
+            for reply in replier.generate_candidate_moves(max_candidates=width, player="X"):
+                board.place(reply[0], reply[1], "X")
+                key = canonical_key(board.grid)[0]
+                board.remove(reply[0], reply[1])
+                if key not in seen:
+                    seen.add(key)
+                    next_frontier.append(moves + [mv, reply])
+        frontier = next_frontier
+
+
+def build_from_selfplay(entries, games, plies, time_limit, seed=1):
+    rng = random.Random(seed)
+    size = Config.BOARD_SIZE
+    center = size // 2
+    for g in range(games):
+        board = new_board()
+        ais = {"X": make_ai(board, "X", time_limit), "O": make_ai(board, "O", time_limit)}
+        history = []
+        p = "X"
+        winner = None
+        for turn in range(size * size):
+            if turn == 0:
+                mv = (center + rng.randint(-2, 2), center + rng.randint(-2, 2))
+            else:
+                ais[p].set_board(board)
+                mv = ais[p].get_move()
+            if not mv:
+                break
+            history.append((p, mv, [row[:] for row in board.grid]))
+            board.place(mv[0], mv[1], p)
+            if board.has_five(p):
+                winner = p
+                break
+            p = "O" if p == "X" else "X"
+        print(f"  game {g + 1}/{games}: {len(history)} moves, winner {winner or '-'}")
+        if winner is None:
+            continue
+        for mover, mv, grid in history[:plies]:
+            if mover == winner:
+                add_entry(entries, grid, mv, 1)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Build or extend the HardAI opening book.")
+    parser.add_argument("mode", choices=["search", "selfplay"])
+    parser.add_argument("--out", default=BOOK_FILE)
+    parser.add_argument("--plies", type=int, default=None, help="search: O moves deep; selfplay: stones recorded")
+    parser.add_argument("--width", type=int, default=5, help="X replies expanded per position (search)")
+    parser.add_argument("--games", type=int, default=40)
+    parser.add_argument("--time", type=float, default=None, help="seconds per move")
+    args = parser.parse_args()
+
+    book = OpeningBook(args.out)
+    entries = {key: (move, weight) for key, move, weight in book.entries()}
+    book.close()
+    before = len(entries)
+    print(f"Book {args.out}: {before} positions")
+
+    if args.mode == "search":
+        build_from_search(entries, args.plies or 3, args.width, args.time or 2.0)
+    else:
+        build_from_selfplay(entries, args.games, args.plies or 8, args.time or 0.5)
+
+    OpeningBook.write(args.out, entries, Config.BOARD_SIZE)
+    print(f"Wrote {len(entries)} positions ({len(entries) - before} new)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,6 +1,13 @@
 import pygame, sys, os, random, math, json, socket, threading, queue, time
+import concurrent.futures, multiprocessing, mmap, struct
 from math import inf
+from array import array
+from collections import OrderedDict
 from datetime import datetime
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 os.environ['SDL_IM_MODULE'] = 'ibus'
 
@@ -23,7 +30,17 @@ def load_settings():
             "volume": 100,
             "theme": "default",
             "last_player_name": "",
-            "lan_cooldown_until": 0
+            "lan_cooldown_until": 0,
+            "ai_tt_mb": 16,
+            "ai_workers": 1,
+            "ai_book": True,
+            "ai_cache": True,
+            "ai_cache_mb": 4,
+            "ai_numpy": True,
+            "ai_time_ms": 500,
+            "ai_ponder": True,
+            "max_fps": 60,
+            "battery_saver": False
         }
     try:
         with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
@@ -36,7 +53,17 @@ def load_settings():
             "volume": 100,
             "theme": "default",
             "last_player_name": "",
-            "lan_cooldown_until": 0
+            "lan_cooldown_until": 0,
+            "ai_tt_mb": 16,
+            "ai_workers": 1,
+            "ai_book": True,
+            "ai_cache": True,
+            "ai_cache_mb": 4,
+            "ai_numpy": True,
+            "ai_time_ms": 500,
+            "ai_ponder": True,
+            "max_fps": 60,
+            "battery_saver": False
         }
 
 def save_settings(data):
@@ -118,6 +145,8 @@ WIN_AI_THRESHOLDS = [
 ]
 
 # ======================= NETWORK MANAGER =====================================
+NETWORK_EVENT = pygame.USEREVENT + 1  # wakes the game loop when a network message is queued
+
 class NetworkManager:
     def __init__(self):
         self.client = None
@@ -255,13 +284,21 @@ class NetworkManager:
             print(f"Lỗi tạo server: {e}")
             return False
 
+    def post(self, item):
+        """Queue a message for the game loop and wake it up if it is idle."""
+        self.msg_queue.put(item)
+        try:
+            pygame.event.post(pygame.event.Event(NETWORK_EVENT))
+        except:
+            pass
+
     def wait_for_client(self):
         try:
             self.client, addr = self.server.accept()
             self.peer_addr = addr
             self.connected = True
             threading.Thread(target=self.receive_loop, daemon=True).start()
-            self.msg_queue.put(("sys", "connected"))
+            self.post(("sys", "connected"))
         except:
             pass
 
@@ -274,7 +311,7 @@ class NetworkManager:
             self.client.connect((ip, self.port))
             self.connected = True
             threading.Thread(target=self.receive_loop, daemon=True).start()
-            self.msg_queue.put(("sys", "connected"))
+            self.post(("sys", "connected"))
             return True
         except Exception as e:
             print(f"Lỗi kết nối: {e}")
@@ -287,7 +324,7 @@ class NetworkManager:
                 if not data:
                     # remote closed cleanly
                     self.connected = False
-                    self.msg_queue.put(("sys", "disconnect"))
+                    self.post(("sys", "disconnect"))
                     break
 
                 self.buffer += data
@@ -298,32 +335,32 @@ class NetworkManager:
 
                     if msg.startswith("move:"):
                         parts = msg.split(":")[1].split(",")
-                        self.msg_queue.put(("move", (int(parts[0]), int(parts[1]))))
+                        self.post(("move", (int(parts[0]), int(parts[1]))))
                     elif msg == "restart":
                         # restart is disabled for LAN - ignore or optionally notify
-                        self.msg_queue.put(("net_restart", None))
+                        self.post(("net_restart", None))
                     elif msg.startswith("chat:"):
                         content = msg.split("chat:", 1)[1]
-                        self.msg_queue.put(("chat", content))
+                        self.post(("chat", content))
                     elif msg.startswith("name:"):
                         name = msg.split("name:", 1)[1]
-                        self.msg_queue.put(("name", name))
+                        self.post(("name", name))
                     elif msg.startswith("left:"):
                         name = msg.split("left:", 1)[1]
                         self.remote_sent_left = True
-                        self.msg_queue.put(("left", name))
+                        self.post(("left", name))
                     elif msg == "REQ_REMATCH":
-                        self.msg_queue.put(("net_req_rematch", None))
+                        self.post(("net_req_rematch", None))
                     elif msg == "ACCEPT_REMATCH":
-                        self.msg_queue.put(("net_accept_rematch", None))
+                        self.post(("net_accept_rematch", None))
                     elif msg == "DENY_REMATCH":
-                        self.msg_queue.put(("net_deny_rematch", None))
+                        self.post(("net_deny_rematch", None))
                     elif msg == "OFFER_DRAW":
-                        self.msg_queue.put(("offer_draw", None))
+                        self.post(("offer_draw", None))
                     elif msg == "ACCEPT_DRAW":
-                        self.msg_queue.put(("accept_draw", None))
+                        self.post(("accept_draw", None))
                     elif msg == "DENY_DRAW":
-                        self.msg_queue.put(("deny_draw", None))
+                        self.post(("deny_draw", None))
                     elif msg.startswith("opponent_quit"):
                         # format: "opponent_quit:NAME" or just "opponent_quit"
                         name = None
@@ -332,13 +369,13 @@ class NetworkManager:
                                 name = msg.split(":", 1)[1]
                             except:
                                 name = None
-                        self.msg_queue.put(("opponent_quit", name))
+                        self.post(("opponent_quit", name))
 
             except:
                 # network error / sudden disconnect
                 self.connected = False
                 self.disconnected_midgame = True
-                self.msg_queue.put(("sys", "disconnect"))
+                self.post(("sys", "disconnect"))
                 break
 
     def send_raw(self, msg):
@@ -404,33 +441,137 @@ class NetworkManager:
             pass
 
 # ======================= PARTICLE & LEADERBOARD ==============================
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        angle = random.uniform(0, 6.28)
-        speed = random.uniform(2, 6)
-        self.vx = math.cos(angle) * speed
-        self.vy = math.sin(angle) * speed
-        self.radius = random.randint(3, 6)
-        self.life = 1.0
-        self.decay = random.uniform(0.01, 0.03)
-        self.gravity = 0.1
+class ParticleSystem:
+    """
+    Particles kept in parallel arrays (numpy when available, else array('d')): position,
+    velocity, life, decay, radius and colour. All live particles move in one update step;
+    dead slots go to a free list and are reused by the next emit, the arrays only grow
+    when the pool is full. Sprites are pre-rendered per (colour, radius, alpha bucket).
+    """
+    GRAVITY = 0.1
+    SHRINK = 0.05  # radius lost per frame
+    ALPHA_BUCKETS = 16
+
+    def __init__(self, capacity=256, use_numpy=True):
+        self.use_numpy = use_numpy and np is not None
+        self.capacity = 0
+        self.count = 0  # live particles
+        self.free = []  # dead slot indices, reused before growing
+        self.colors = []  # palette, particles store an index into it
+        self.sprites = {}  # (colour index, radius, alpha bucket) -> Surface
+        fields = ("x", "y", "vx", "vy", "life", "decay", "radius", "color")
+        for name in fields:
+            setattr(self, name, np.zeros(0) if self.use_numpy else array('d'))
+        self.alive = np.zeros(0, dtype=bool) if self.use_numpy else bytearray()
+        self._grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, capacity):
+        extra = capacity - self.capacity
+        for name in ("x", "y", "vx", "vy", "life", "decay", "radius", "color"):
+            old = getattr(self, name)
+            if self.use_numpy:
+                setattr(self, name, np.concatenate([old, np.zeros(extra)]))
+            else:
+                old.extend(array('d', bytes(8 * extra)))
+        if self.use_numpy:
+            self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        else:
+            self.alive.extend(bytes(extra))
+        # lowest slots first
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def clear(self):
+        self.alive[:] = False if self.use_numpy else bytes(self.capacity)
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.count = 0
+
+    def emit(self, x, y, color, n):
+        """n particles bursting from (x, y) in random directions."""
+        if color not in self.colors:
+            self.colors.append(color)
+        ci = self.colors.index(color)
+        if len(self.free) < n:
+            self._grow(max(2 * self.capacity, self.count + n))
+        for _ in range(n):
+            i = self.free.pop()
+            angle = random.uniform(0, 6.28)
+            speed = random.uniform(2, 6)
+            self.x[i] = x
+            self.y[i] = y
+            self.vx[i] = math.cos(angle) * speed
+            self.vy[i] = math.sin(angle) * speed
+            self.radius[i] = random.randint(3, 6)
+            self.life[i] = 1.0
+            self.decay[i] = random.uniform(0.01, 0.03)
+            self.color[i] = ci
+            self.alive[i] = True
+        self.count += n
 
     def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += self.gravity
-        self.life -= self.decay
-        self.radius = max(0, self.radius - 0.05)
+        if not self.count:
+            return
+        if self.use_numpy:
+            # dead slots move too: cheaper than masking, and emit overwrites them
+            self.x += self.vx
+            self.y += self.vy
+            self.vy += self.GRAVITY
+            self.life -= self.decay
+            np.maximum(self.radius - self.SHRINK, 0, out=self.radius)
+            dead = np.flatnonzero(self.alive & (self.life <= 0))
+            if len(dead):
+                self.alive[dead] = False
+                self.free.extend(dead.tolist())
+                self.count -= len(dead)
+            return
+        x, y, vx, vy, life, decay, radius, alive = (self.x, self.y, self.vx, self.vy,
+                                                    self.life, self.decay, self.radius, self.alive)
+        g, shrink = self.GRAVITY, self.SHRINK
+        for i in range(self.capacity):
+            if not alive[i]:
+                continue
+            x[i] += vx[i]
+            y[i] += vy[i]
+            vy[i] += g
+            life[i] -= decay[i]
+            radius[i] = max(0.0, radius[i] - shrink)
+            if life[i] <= 0:
+                alive[i] = 0
+                self.free.append(i)
+                self.count -= 1
+
+    def _sprite(self, ci, r, bucket):
+        key = (ci, r, bucket)
+        s = self.sprites.get(key)
+        if s is None:
+            alpha = (bucket + 1) * 255 // self.ALPHA_BUCKETS
+            s = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+            pygame.draw.circle(s, (*self.colors[ci], alpha), (r, r), r)
+            self.sprites[key] = s
+        return s
 
     def draw(self, screen):
-        if self.life > 0 and self.radius > 0:
-            alpha = int(self.life * 255)
-            s = pygame.Surface((int(self.radius*2), int(self.radius*2)), pygame.SRCALPHA)
-            pygame.draw.circle(s, (*self.color, alpha), (int(self.radius), int(self.radius)), int(self.radius))
-            screen.blit(s, (int(self.x) - self.radius, int(self.y) - self.radius))
+        if not self.count:
+            return
+        buckets = self.ALPHA_BUCKETS
+        if self.use_numpy:
+            idx = np.flatnonzero(self.alive)
+            rs = self.radius[idx].astype(np.int64)
+            keep = rs > 0
+            idx, rs = idx[keep], rs[keep]
+            bs = np.minimum((self.life[idx] * buckets).astype(np.int64), buckets - 1)
+            xs = self.x[idx].astype(np.int64) - rs
+            ys = self.y[idx].astype(np.int64) - rs
+            cs = self.color[idx].astype(np.int64)
+            items = zip(cs.tolist(), rs.tolist(), bs.tolist(), xs.tolist(), ys.tolist())
+        else:
+            items = [(int(self.color[i]), int(self.radius[i]), min(int(self.life[i] * buckets), buckets - 1),
+                      int(self.x[i]) - int(self.radius[i]), int(self.y[i]) - int(self.radius[i]))
+                     for i in range(self.capacity) if self.alive[i] and int(self.radius[i]) > 0]
+        screen.blits([(self._sprite(ci, r, b), (px, py)) for ci, r, b, px, py in items], False)
 
 class Leaderboard:
     def __init__(self):
@@ -499,6 +640,9 @@ class Config:
     CELL_SIZE = (HEIGHT - BOTTOM_BAR) // BOARD_SIZE
     WIDTH = BOARD_SIZE * CELL_SIZE
     FPS = 60
+    IDLE_FPS = 10  # static screens: wake-ups per second when nothing happens
+    SAVER_FPS = 30  # battery saver caps
+    SAVER_IDLE_FPS = 2
 
     PIXEL_FONT_FILE = path("font", "PixelOperator.ttf")
     SYSTEM_FONT_FILE = path("font", "arial.ttf")
@@ -571,10 +715,12 @@ class Config:
         "quit": {"vi": "Thoát", "en": "Quit"},
         "hint": {"vi": "Game Đang Trong Giai Đoạn Phát Triển", "en": "The game is in development"},
         "lang_btn": {"vi": "Ngôn ngữ:", "en": "Language:"},
+        "battery_btn": {"vi": "Tiết kiệm pin:", "en": "Battery saver:"},
         "restart": {"vi": "Chơi Lại", "en": "Restart"},
         "menu_back": {"vi": "Menu", "en": "Menu"},
         "undo": {"vi": "Đi Lại", "en": "Undo"},
         "turn_of": {"vi": "Lượt của:", "en": "Turn of:"},
+        "ai_thinking": {"vi": "AI đang suy nghĩ", "en": "AI is thinking"},
         "win_x": {"vi": "Người chơi X thắng!", "en": "Player X wins!"},
         "win_o": {"vi": "Người chơi O thắng!", "en": "Player O wins!"},
         "draw": {"vi": "Hòa rồi!", "en": "It's a Draw!"},
@@ -643,20 +789,364 @@ class Config:
     LOSE_SOUND = safe_load_sound(LOSE_SOUND_FILE)
     TING_SOUND = safe_load_sound(TING_SOUND_FILE)
 
+class GlyphCache:
+    """
+    LRU cache of rendered text surfaces keyed by (font, text, color, alpha, scale).
+    Returned surfaces are shared: blit them, never draw on them or change their alpha.
+    """
+    def __init__(self, max_items=512):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, alpha=None, scale=1.0):
+        key = (font, text, color, alpha, scale)
+        surf = self.items.get(key)
+        if surf is not None:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        if scale != 1.0:
+            sw = max(1, int(surf.get_width() * scale))
+            sh = max(1, int(surf.get_height() * scale))
+            surf = pygame.transform.scale(surf, (sw, sh))
+        if alpha is not None:
+            surf.set_alpha(alpha)
+        self.items[key] = surf
+        if len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self.items.clear()
+
+GLYPHS = GlyphCache()
+
+# ======================= PATTERN TABLE ========================================
+# Threat class created when a player puts a stone on the centre cell of a window,
+# looking along one direction. Larger = stronger.
+T_NONE, T_ONE, T_TWO, T_THREE, T_SPLIT3, T_OPEN3, T_FOUR, T_OPEN4, T_FIVE = range(9)
+
+def _classify_window(cells, n):
+    """
+    Classify one window of 2n-1 cells (0 empty, 1 own, 2 opponent/off-board) whose
+    centre holds the freshly placed own stone.
+    """
+    def completions(cs):
+        # empty cells that would complete n in a row together with the centre stone
+        found = set()
+        best = 0
+        live = False
+        for s in range(len(cs) - n + 1):
+            win = cs[s:s + n]
+            if 2 in win:
+                continue
+            live = True
+            k = win.count(1)
+            if k > best:
+                best = k
+            if k == n - 1:
+                found.add(s + win.index(0))
+        return found, best, live
+
+    found, best, live = completions(cells)
+    if best == n:
+        return T_FIVE
+    if len(found) >= 2:
+        return T_OPEN4
+    if found:
+        return T_FOUR
+    if best == n - 2:
+        for e, v in enumerate(cells):
+            if v != 0:
+                continue
+            trial = list(cells)
+            trial[e] = 1
+            if len(completions(trial)[0]) >= 2:
+                # three that can still become an open four: solid (.XXX.) or split (X.XX)
+                h = n - 1
+                run = 1
+                i = h - 1
+                while i >= 0 and cells[i] == 1:
+                    run += 1; i -= 1
+                i = h + 1
+                while i < len(cells) and cells[i] == 1:
+                    run += 1; i += 1
+                return T_OPEN3 if run >= n - 2 else T_SPLIT3
+        return T_THREE
+    if best == n - 3:
+        return T_TWO
+    return T_ONE if live else T_NONE
+
+def build_pattern_table(win_cond):
+    """
+    Map every window of 2*(win_cond-1) neighbours around an empty centre to a threat class.
+    Index = sum(digit_j * 3**j) over the neighbours from -(win_cond-1) to +(win_cond-1),
+    skipping the centre; digit 0 = empty, 1 = own stone, 2 = opponent or off-board.
+    """
+    half = win_cond - 1
+    span = 2 * half
+    table = bytearray(3 ** span)
+    for idx in range(3 ** span):
+        digits = []
+        v = idx
+        for _ in range(span):
+            digits.append(v % 3)
+            v //= 3
+        cells = digits[:half] + [1] + digits[half:]
+        table[idx] = _classify_window(cells, win_cond)
+    return table
+
+_PATTERN_TABLES = {}
+
+def pattern_table(win_cond):
+    """Threat-class table for win_cond, built once and shared."""
+    table = _PATTERN_TABLES.get(win_cond)
+    if table is None:
+        table = _PATTERN_TABLES[win_cond] = build_pattern_table(win_cond)
+    return table
+
+PATTERN_TABLE = pattern_table(Config.WIN_CONDITION)
+
+_LINE_CACHE = {}
+_LINE_CACHE_LIMIT = 200_000
+
+def line_classes(own, opp, length, win_cond):
+    """
+    Threat class of every cell of a line for the player owning `own` (bit i = cell i).
+    Occupied cells get T_NONE. Results are memoised per line content.
+    """
+    key = (own, opp, length, win_cond)
+    res = _LINE_CACHE.get(key)
+    if res is not None:
+        return res
+    table = pattern_table(win_cond)
+    half = win_cond - 1
+    digits = []
+    for i in range(-half, length + half):
+        if i < 0 or i >= length or (opp >> i) & 1:
+            digits.append(2)
+        elif (own >> i) & 1:
+            digits.append(1)
+        else:
+            digits.append(0)
+    res = []
+    for i in range(length):
+        if digits[i + half] != 0:
+            res.append(T_NONE)
+            continue
+        idx = 0
+        mul = 1
+        for j in range(i, i + 2 * half + 1):
+            if j == i + half:
+                continue
+            idx += digits[j] * mul
+            mul *= 3
+        res.append(table[idx])
+    res = tuple(res)
+    if len(_LINE_CACHE) >= _LINE_CACHE_LIMIT:
+        _LINE_CACHE.clear()
+    _LINE_CACHE[key] = res
+    return res
+
 # ======================= BOARD, AI (updated logic) ============================
 class Board:
+    FRONTIER_RADIUS = 2  # candidate moves are the empty cells this close to a stone
+    POP_FRAMES = 12  # distinct sizes of the pop-in animation of a new stone (glyphs cached per frame)
+
     def __init__(self, size, win_cond, allow_blocked):
         self.size = size
         self.win_cond = win_cond
         self.allow_blocked = allow_blocked
+        self._build_bit_masks()
+        self._build_neighbourhoods()
+        self._reset_render()
         self.reset()
 
     def reset(self):
         self.grid = [["" for _ in range(self.size)] for _ in range(self.size)]
+        self._reset_stones()
         self.winning_line = None
         self.winning_cells = []
         self.place_animations = {}
 
+    def _reset_stones(self):
+        # bitboards: one int per player per orientation (row, col, diag, anti-diag)
+        self.bits = {"X": [0, 0, 0, 0], "O": [0, 0, 0, 0]}
+        # frontier: empty cells within FRONTIER_RADIUS of a stone; near_count[r*size+c] = stones that close
+        self.near_count = [0] * (self.size * self.size)
+        self.frontier = set()
+        self.empty = set((r, c) for r in range(self.size) for c in range(self.size))
+        self.stone_count = 0
+
+    def _build_bit_masks(self):
+        """
+        Precompute the bit of every cell in each orientation. Every line is laid out
+        contiguously with one spare zero bit after it, so shifting never crosses lines.
+        """
+        size = self.size
+        stride = size + 1
+        self.bit_masks = [[[0] * size for _ in range(size)] for _ in range(4)]
+        self.full_masks = [0, 0, 0, 0]
+        for r in range(size):
+            for c in range(size):
+                diag_line = c - r + size - 1
+                anti_line = r + c
+                idx = (
+                    r * stride + c,
+                    c * stride + r,
+                    diag_line * stride + (r - max(0, r - c)),
+                    anti_line * stride + (r - max(0, anti_line - (size - 1)))
+                )
+                for o in range(4):
+                    self.bit_masks[o][r][c] = 1 << idx[o]
+                    self.full_masks[o] |= 1 << idx[o]
+
+    def _build_neighbourhoods(self):
+        """neighbourhood[r][c]: (flat index, cell) of the cells within FRONTIER_RADIUS of (r, c), (r, c) included."""
+        size = self.size
+        R = self.FRONTIER_RADIUS
+        self.neighbourhood = [[[(rr * size + cc, (rr, cc))
+                                for rr in range(max(0, r - R), min(size, r + R + 1))
+                                for cc in range(max(0, c - R), min(size, c + R + 1))]
+                               for c in range(size)] for r in range(size)]
+
+    def copy(self):
+        """Detached copy of the position (grid + bitboards) for background AI search; no UI state."""
+        b = Board.__new__(Board)
+        b.size = self.size
+        b.win_cond = self.win_cond
+        b.allow_blocked = self.allow_blocked
+        b.bit_masks = self.bit_masks
+        b.full_masks = self.full_masks
+        b.neighbourhood = self.neighbourhood
+        b.grid = [row[:] for row in self.grid]
+        b.bits = {p: v[:] for p, v in self.bits.items()}
+        b.near_count = self.near_count[:]
+        b.frontier = set(self.frontier)
+        b.empty = set(self.empty)
+        b.stone_count = self.stone_count
+        b.winning_line = None
+        b.winning_cells = []
+        b.place_animations = {}
+        b._reset_render()
+        return b
+
+    def snapshot(self):
+        """SearchBoard with this position for the AI search (bitboards and frontier copied, cells packed)."""
+        b = SearchBoard.__new__(SearchBoard)
+        b.size = self.size
+        b.win_cond = self.win_cond
+        b.allow_blocked = self.allow_blocked
+        b.bit_masks = self.bit_masks
+        b.full_masks = self.full_masks
+        b.neighbourhood = self.neighbourhood
+        b.bits = {p: v[:] for p, v in self.bits.items()}
+        b.near_count = self.near_count[:]
+        b.frontier = set(self.frontier)
+        b.empty = set(self.empty)
+        b.stone_count = self.stone_count
+        b.hash = None
+        b.evaluator = None
+        b._init_cells()
+        stride = b.stride
+        codes = SearchBoard.CODES
+        cells = b.cells
+        for r, row in enumerate(self.grid):
+            base = (r + 1) * stride + 1
+            for c, v in enumerate(row):
+                if v:
+                    cells[base + c] = codes[v]
+        return b
+
+    def place(self, r, c, p):
+        """Put p on (r, c), keeping grid, bitboards and frontier in sync."""
+        self.grid[r][c] = p
+        self._add_stone(r, c, p)
+
+    def remove(self, r, c):
+        """Clear (r, c), keeping grid and bitboards in sync."""
+        p = self.grid[r][c]
+        if p == "":
+            return
+        self.grid[r][c] = ""
+        self._drop_stone(r, c, p)
+
+    def _add_stone(self, r, c, p):
+        bits = self.bits[p]
+        masks = self.bit_masks
+        bits[0] |= masks[0][r][c]
+        bits[1] |= masks[1][r][c]
+        bits[2] |= masks[2][r][c]
+        bits[3] |= masks[3][r][c]
+        self.stone_count += 1
+        self.empty.discard((r, c))
+        near = self.near_count
+        frontier = self.frontier
+        # an occupied cell always counts its own stone, so a count going 0 -> 1 is an empty cell
+        for i, cell in self.neighbourhood[r][c]:
+            near[i] += 1
+            if near[i] == 1:
+                frontier.add(cell)
+        frontier.discard((r, c))
+
+    def _drop_stone(self, r, c, p):
+        bits = self.bits[p]
+        masks = self.bit_masks
+        bits[0] &= ~masks[0][r][c]
+        bits[1] &= ~masks[1][r][c]
+        bits[2] &= ~masks[2][r][c]
+        bits[3] &= ~masks[3][r][c]
+        self.stone_count -= 1
+        self.empty.add((r, c))
+        near = self.near_count
+        frontier = self.frontier
+        for i, cell in self.neighbourhood[r][c]:
+            near[i] -= 1
+            if near[i] == 0:
+                frontier.discard(cell)
+        if near[r * self.size + c] > 0:
+            frontier.add((r, c))
+
+    def has_five(self, p):
+        """Shift-and-mask five-in-a-row test for p, honouring the allow_blocked rule."""
+        n = self.win_cond
+        opp_bits = self.bits["O" if p == "X" else "X"]
+        for o, b in enumerate(self.bits[p]):
+            w = b
+            for k in range(1, n):
+                w &= b >> k
+            if not w:
+                continue
+            if self.allow_blocked:
+                return True
+            # a run counts unless both of its ends touch an opponent stone
+            opp = opp_bits[o]
+            we = b
+            for k in range(1, n):
+                we &= b << k
+            starts = w & ~(b << 1) & ~(opp << 1)
+            ends = we & ~(b >> 1) & ~(opp >> 1)
+            if starts or ends:
+                return True
+        return False
+
+    def has_run(self, p, length):
+        """True if p has at least `length` stones in a row in any orientation."""
+        for b in self.bits[p]:
+            w = b
+            for k in range(1, length):
+                w &= b >> k
+            if w:
+                return True
+        return False
+
+    def at(self, r, c):
+        return self.grid[r][c]
+
     def cell_rect(self, r, c):
         x = c * Config.CELL_SIZE
         y = r * Config.CELL_SIZE
@@ -665,57 +1155,133 @@ class Board:
     def pixel_center(self, r, c):
         return (c * Config.CELL_SIZE + Config.CELL_SIZE // 2, r * Config.CELL_SIZE + Config.CELL_SIZE // 2)
 
-    def draw(self, screen, game_state, current_player, mouse_pos):
-        screen.fill(Config.BG_COLOR)
+    def _reset_render(self):
+        # cached rendering: empty board drawn once, stones kept on a layer over it
+        self._background = None
+        self._layer = None
+        self._shown = {}  # (r, c) -> (stone, scale, glyph rect) currently on the layer
+        self._hover = None  # (row, col, player, rect) drawn on the screen last frame
+
+    def _build_layers(self):
+        side = self.size * Config.CELL_SIZE
+        self._background = pygame.Surface((side, side))
+        self._background.fill(Config.BG_COLOR)
         for r in range(self.size):
             for c in range(self.size):
                 rect = self.cell_rect(r, c)
-                pygame.draw.rect(screen, Config.CELL_BG, rect)
-                pygame.draw.rect(screen, Config.WOOD_BORDER, rect, 1)
-
-        if game_state == "game" and not self.winning_line and mouse_pos[1] < self.size * Config.CELL_SIZE:
-            col = mouse_pos[0] // Config.CELL_SIZE
-            row = mouse_pos[1] // Config.CELL_SIZE
-            if 0 <= row < self.size and 0 <= col < self.size and self.grid[row][col] == "":
-                pygame.draw.rect(screen, Config.HOVER_COLOR, self.cell_rect(row, col))
-                color = Config.X_COLOR if current_player == "X" else Config.O_COLOR
-                surf = Config.FONT_XO.render(current_player, True, color)
-                surf.set_alpha(100)
-                center = self.pixel_center(row, col)
-                screen.blit(surf, (center[0] - surf.get_width() // 2, center[1] - surf.get_height() // 2))
+                pygame.draw.rect(self._background, Config.CELL_BG, rect)
+                pygame.draw.rect(self._background, Config.WOOD_BORDER, rect, 1)
+        self._layer = self._background.copy()
+        self._shown = {}
+        self._hover = None
+        # pre-scale every pop-in frame so placing a stone never scales a glyph mid-animation
+        for v in ("X", "O"):
+            for frame in range(self.POP_FRAMES + 1):
+                self._stone_glyph(v, self.pop_scale(frame))
+
+    def pop_scale(self, frame):
+        return 1.6 - 0.6 * frame / self.POP_FRAMES
+
+    def _stone_glyph(self, v, scale):
+        color = Config.X_COLOR if v == "X" else Config.O_COLOR
+        return GLYPHS.render(Config.FONT_XO, v, color, scale=scale)
+
+    def _paint_area(self, area):
+        """Repaint one rect of the stone layer: background, then every stone overlapping it."""
+        layer = self._layer
+        layer.set_clip(area)
+        layer.blit(self._background, area, area)
+        cs = Config.CELL_SIZE
+        for r in range(max(0, area.top // cs - 1), min(self.size, area.bottom // cs + 2)):
+            for c in range(max(0, area.left // cs - 1), min(self.size, area.right // cs + 2)):
+                shown = self._shown.get((r, c))
+                if shown and shown[2].colliderect(area):
+                    layer.blit(self._stone_glyph(shown[0], shown[1]), shown[2])
+        layer.set_clip(None)
+
+    def draw(self, screen, game_state, current_player, mouse_pos, full=True):
+        """
+        Draw the board area and return the screen rects that changed.
+        Only cells whose stone, pop-in frame or hover state changed are repainted;
+        full=True blits the whole board (needed after something else drew over it).
+        """
+        if self._layer is None:
+            self._build_layers()
+            full = True
+        side = self.size * Config.CELL_SIZE
+        board_rect = pygame.Rect(0, 0, side, side)
 
         now = pygame.time.get_ticks()
+        areas = []
         to_delete = []
-        for r in range(self.size):
-            for c in range(self.size):
-                v = self.grid[r][c]
+        shown = self._shown
+        for r, row in enumerate(self.grid):
+            for c, v in enumerate(row):
+                key = (r, c)
+                old = shown.get(key)
                 if v == "":
+                    if old:
+                        areas.append(old[2])
+                        del shown[key]
                     continue
-                center = self.pixel_center(r, c)
-                color = Config.X_COLOR if v == "X" else Config.O_COLOR
-                surf = Config.FONT_XO.render(v, True, color)
-                key = (r, c)
                 scale = 1.0
                 if key in self.place_animations:
                     start, dur = self.place_animations[key]
                     elapsed = now - start
                     if elapsed < dur:
-                        t = elapsed / dur
-                        scale = 1.6 - 0.6 * t
+                        scale = self.pop_scale(elapsed * self.POP_FRAMES // dur)
                     else:
-                        scale = 1.0
                         to_delete.append(key)
-
-                if scale != 1.0:
-                    sw = max(1, int(surf.get_width() * scale))
-                    sh = max(1, int(surf.get_height() * scale))
-                    surf = pygame.transform.scale(surf, (sw, sh))
-
-                screen.blit(surf, (center[0] - surf.get_width() // 2, center[1] - surf.get_height() // 2))
-
+                if old is None or old[0] != v or old[1] != scale:
+                    rect = self._stone_glyph(v, scale).get_rect(center=self.pixel_center(r, c))
+                    if old:
+                        areas.append(old[2])
+                    areas.append(rect)
+                    shown[key] = (v, scale, rect)
         for key in to_delete:
             del self.place_animations[key]
 
+        areas = [a.clip(board_rect) for a in areas]
+        for area in areas:
+            self._paint_area(area)
+
+        hover = None
+        if game_state == "game" and not self.winning_line and mouse_pos[1] < side:
+            col = mouse_pos[0] // Config.CELL_SIZE
+            row = mouse_pos[1] // Config.CELL_SIZE
+            if 0 <= row < self.size and 0 <= col < self.size and self.grid[row][col] == "":
+                hover = (row, col, current_player)
+
+        old_hover = self._hover
+        hover_changed = (old_hover[:3] if old_hover else None) != hover
+        if full:
+            screen.fill(Config.BG_COLOR)
+            screen.blit(self._layer, (0, 0))
+            dirty = [board_rect]
+        else:
+            dirty = areas
+            if old_hover:
+                # the ghost stone is translucent: restore the cell before drawing it again
+                screen.blit(self._layer, old_hover[3], old_hover[3])
+                if hover_changed:
+                    dirty.append(old_hover[3])
+            for area in areas:
+                screen.blit(self._layer, area, area)
+
+        self._hover = None
+        if hover:
+            row, col = hover[0], hover[1]
+            cell = self.cell_rect(row, col)
+            pygame.draw.rect(screen, Config.HOVER_COLOR, cell)
+            color = Config.X_COLOR if current_player == "X" else Config.O_COLOR
+            surf = GLYPHS.render(Config.FONT_XO, current_player, color, alpha=100)
+            rect = surf.get_rect(center=self.pixel_center(row, col))
+            screen.blit(surf, rect)
+            self._hover = (row, col, current_player, cell.union(rect).clip(board_rect))
+            if hover_changed and not full:
+                dirty.append(self._hover[3])
+        return dirty
+
     def draw_highlight(self, screen, flash_phase):
         if not self.winning_line:
             return
@@ -725,54 +1291,1142 @@ class Board:
                 pygame.draw.rect(screen, Config.HOVER_COLOR, rct.inflate(-4, -4))
             pygame.draw.line(screen, Config.HIGHLIGHT_LINE, self.winning_line[0], self.winning_line[1], 8)
 
-    def check_winner(self):
-        result, cells, line = self.check_winner_pure(self.grid)
+    def check_winner(self, last_move=None):
+        if last_move is not None:
+            result, cells, line = self.check_winner_at(self.grid, last_move[0], last_move[1])
+        else:
+            result, cells, line = self.check_winner_pure(self.grid)
         self.winning_cells = cells
         self.winning_line = line
         return result
 
+    def _line_through(self, grid, r, c, dr, dc, p):
+        """
+        Measure the run of p through (r, c) along (dr, dc).
+        Returns (cells, pixel_line) if it is a win under the allow_blocked rule, else None.
+        """
+        size = self.size
+        count = 1
+        sr, sc = r, c
+        er, ec = r, c
+        rr, cc = r + dr, c + dc
+        while 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == p:
+            count += 1
+            er, ec = rr, cc
+            rr += dr; cc += dc
+        rr, cc = r - dr, c - dc
+        while 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == p:
+            count += 1
+            sr, sc = rr, cc
+            rr -= dr; cc -= dc
+        if count < self.win_cond:
+            return None
+        if not self.allow_blocked:
+            prev_r, prev_c = sr - dr, sc - dc
+            next_r, next_c = er + dr, ec + dc
+            blocked_start = 0 <= prev_r < size and 0 <= prev_c < size and grid[prev_r][prev_c] != "" and grid[prev_r][prev_c] != p
+            blocked_end = 0 <= next_r < size and 0 <= next_c < size and grid[next_r][next_c] != "" and grid[next_r][next_c] != p
+            if blocked_start and blocked_end:
+                return None
+        cells = []
+        rr, cc = sr, sc
+        for _ in range(count):
+            cells.append((rr, cc))
+            rr += dr; cc += dc
+        line_start = (sc * Config.CELL_SIZE + Config.CELL_SIZE // 2, sr * Config.CELL_SIZE + Config.CELL_SIZE // 2)
+        line_end = (ec * Config.CELL_SIZE + Config.CELL_SIZE // 2, er * Config.CELL_SIZE + Config.CELL_SIZE // 2)
+        return cells, (line_start, line_end)
+
+    def check_winner_at(self, grid, r, c):
+        """
+        Incremental win check: only the four lines through the stone at (r, c) are scanned,
+        so it costs O(win_cond) instead of O(size^2). Valid when (r, c) is the last move.
+        """
+        p = grid[r][c]
+        if p == "":
+            return None, [], None
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            found = self._line_through(grid, r, c, dr, dc, p)
+            if found:
+                return p, found[0], found[1]
+        return None, [], None
+
     def check_winner_pure(self, grid):
         dirs = [(0, 1), (1, 0), (1, 1), (1, -1)]
         size = self.size
-        win_cond = self.win_cond
+        # on the live grid the bitboards say which players have a long enough run at all
+        players = ("X", "O")
+        if grid is self.grid:
+            players = tuple(p for p in players if self.has_run(p, self.win_cond))
+            if not players:
+                return None, [], None
 
         for r in range(size):
             for c in range(size):
                 p = grid[r][c]
-                if p == "":
+                if p not in players:
                     continue
                 for dr, dc in dirs:
-                    count = 1
-                    sr, sc = r, c
-                    er, ec = r, c
-                    rr, cc = r + dr, c + dc
-                    while 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == p:
-                        count += 1
-                        er, ec = rr, cc
-                        rr += dr; cc += dc
-                    rr, cc = r - dr, c - dc
-                    while 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == p:
-                        count += 1
-                        sr, sc = rr, cc
-                        rr -= dr; cc -= dc
-                    if count >= win_cond:
-                        if not self.allow_blocked:
-                            prev_r, prev_c = sr - dr, sc - dc
-                            next_r, next_c = er + dr, ec + dc
-                            blocked_start = 0 <= prev_r < size and 0 <= prev_c < size and grid[prev_r][prev_c] != "" and grid[prev_r][prev_c] != p
-                            blocked_end = 0 <= next_r < size and 0 <= next_c < size and grid[next_r][next_c] != "" and grid[next_r][next_c] != p
-                            if blocked_start and blocked_end:
-                                continue
-                        cells = []
-                        rr, cc = sr, sc
-                        for _ in range(count):
-                            cells.append((rr, cc))
-                            rr += dr; cc += dc
-                        line_start = (sc * Config.CELL_SIZE + Config.CELL_SIZE // 2, sr * Config.CELL_SIZE + Config.CELL_SIZE // 2)
-                        line_end = (ec * Config.CELL_SIZE + Config.CELL_SIZE // 2, er * Config.CELL_SIZE + Config.CELL_SIZE // 2)
-                        return p, cells, (line_start, line_end)
+                    found = self._line_through(grid, r, c, dr, dc, p)
+                    if found:
+                        return p, found[0], found[1]
         return None, [], None
 
+class SearchBoard(Board):
+    """
+    Board used inside the AI search, taken from the live Board with Board.snapshot().
+    Stones live in a flat bytearray with a one-cell WALL border (row stride size + 2), so
+    walking a line needs no bounds checks; bitboards and frontier work as in Board.
+    make_move/unmake_move also update the attached symmetry hash, LineEvaluator and
+    ThreatIndex, so the search never writes grid cells or restores them by hand.
+    """
+    WALL = 3
+    CODES = {"X": 1, "O": 2}
+    CHARS = ("", "X", "O", "")
+
+    def reset(self):
+        self._reset_stones()
+        self._init_cells()
+
+    def _init_cells(self):
+        size = self.size
+        stride = size + 2
+        self.stride = stride
+        self.steps = (1, stride, stride + 1, stride - 1)  # row, column, diagonal, anti-diagonal
+        self.cells = bytearray([self.WALL]) * (stride * stride)
+        for r in range(size):
+            base = (r + 1) * stride + 1
+            self.cells[base:base + size] = bytes(size)
+
+    def attach(self, sym, evaluator, threats):
+        """SymmetryHash, LineEvaluator and ThreatIndex kept in step by make_move/unmake_move."""
+        self.hash = sym
+        self.evaluator = evaluator
+        self.threats = threats
+
+    def load(self, cells):
+        """Reset to the position in another SearchBoard's cells (as sent to root-search workers)."""
+        self.reset()
+        stride = self.stride
+        for i, v in enumerate(cells):
+            if v == 1 or v == 2:
+                r, c = divmod(i, stride)
+                self.place(r - 1, c - 1, self.CHARS[v])
+
+    @property
+    def grid(self):
+        """List-of-rows copy of the cells, for the few once-per-move callers that want one."""
+        stride = self.stride
+        chars = self.CHARS
+        cells = self.cells
+        return [[chars[cells[(r + 1) * stride + c + 1]] for c in range(self.size)] for r in range(self.size)]
+
+    def at(self, r, c):
+        return self.CHARS[self.cells[(r + 1) * self.stride + c + 1]]
+
+    def place(self, r, c, p):
+        self.cells[(r + 1) * self.stride + c + 1] = self.CODES[p]
+        self._add_stone(r, c, p)
+
+    def remove(self, r, c):
+        i = (r + 1) * self.stride + c + 1
+        v = self.cells[i]
+        if not v:
+            return
+        self.cells[i] = 0
+        self._drop_stone(r, c, self.CHARS[v])
+
+    def make_move(self, r, c, p):
+        self.place(r, c, p)
+        self.hash.toggle(r, c, p)
+        self.evaluator.update(r, c)
+        self.threats.update(r, c)
+
+    def unmake_move(self, r, c, p):
+        self.remove(r, c)
+        self.hash.toggle(r, c, p)
+        self.evaluator.update(r, c)
+        self.threats.update(r, c)
+
+    def wins_at(self, r, c):
+        """check_winner_at for the stone on (r, c), walking the flat cells: True if it completes a win."""
+        cells = self.cells
+        i = (r + 1) * self.stride + c + 1
+        v = cells[i]
+        if not v:
+            return False
+        opp = 3 - v
+        for step in self.steps:
+            j = i + step
+            while cells[j] == v:
+                j += step
+            k = i - step
+            while cells[k] == v:
+                k -= step
+            if (j - k) // step - 1 >= self.win_cond:
+                # the wall does not block, only an opponent stone on both ends does
+                if self.allow_blocked or cells[j] != opp or cells[k] != opp:
+                    return True
+        return False
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table stored in flat typed arrays, so its memory is bounded
+    by size_mb no matter how long a session runs.
+    Each bucket has two slots: slot 0 is depth-preferred, slot 1 is always-replace.
+    An entry keeps (depth, value, bound flag, best move code).
+    """
+    EXACT = 0
+    LOWER = 1   # value is a lower bound (search failed high)
+    UPPER = 2   # value is an upper bound (search failed low)
+    ENTRY_BYTES = 21  # key 8 + value 8 + depth 1 + flag 1 + age 1 + move 2
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        slots = max(2, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.buckets = slots // 2
+        slots = self.buckets * 2
+        self.keys = array('Q', [0]) * slots
+        self.values = array('d', [0.0]) * slots
+        self.depths = array('b', [-1]) * slots
+        self.flags = array('b', [0]) * slots
+        self.ages = array('B', [0]) * slots
+        self.moves = array('h', [-1]) * slots
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Age existing entries so stale deep results from earlier moves can be replaced."""
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key):
+        """Return (depth, value, flag, move_code) for key, or None."""
+        self.probes += 1
+        i = (key % self.buckets) * 2
+        for j in (i, i + 1):
+            if self.keys[j] == key and self.depths[j] >= 0:
+                self.hits += 1
+                return self.depths[j], self.values[j], self.flags[j], self.moves[j]
+        return None
+
+    def store(self, key, depth, value, flag, move_code=-1):
+        i = (key % self.buckets) * 2
+        # depth-preferred slot: take it for the same position, a deeper result or a stale entry
+        if self.keys[i] == key or depth >= self.depths[i] or self.ages[i] != self.age:
+            j = i
+        else:
+            j = i + 1
+        if move_code < 0 and self.keys[j] == key:
+            move_code = self.moves[j]
+        self.keys[j] = key
+        self.values[j] = value
+        self.depths[j] = min(depth, 127)
+        self.flags[j] = flag
+        self.ages[j] = self.age
+        self.moves[j] = move_code
+
+# Deterministic Zobrist keys and the 8 board symmetries (shared by the opening book)
+ZOBRIST_SEED = 0x60B0C0
+_ZOBRIST_KEYS = {}
+_SYMMETRY_MAPS = {}
+
+def zobrist_keys(size):
+    """[r][c] -> (key for X, key for O); seeded, so keys are identical across runs and processes."""
+    keys = _ZOBRIST_KEYS.get(size)
+    if keys is None:
+        rng = random.Random(ZOBRIST_SEED + size)
+        keys = [[(rng.getrandbits(64) | 1, rng.getrandbits(64) | 1) for _ in range(size)] for _ in range(size)]
+        _ZOBRIST_KEYS[size] = keys
+    return keys
+
+def symmetry_maps(size):
+    """
+    (forward, inverse): forward[s][r][c] is the image of (r, c) under dihedral symmetry s
+    (0 = identity, 1-3 rotations, 4-7 reflections); inverse[s] maps it back.
+    """
+    maps = _SYMMETRY_MAPS.get(size)
+    if maps is None:
+        n = size - 1
+        funcs = [
+            lambda r, c: (r, c), lambda r, c: (c, n - r), lambda r, c: (n - r, n - c), lambda r, c: (n - c, r),
+            lambda r, c: (r, n - c), lambda r, c: (n - r, c), lambda r, c: (c, r), lambda r, c: (n - c, n - r),
+        ]
+        forward = [[[f(r, c) for c in range(size)] for r in range(size)] for f in funcs]
+        inverse = [[[None] * size for _ in range(size)] for _ in funcs]
+        for s in range(len(funcs)):
+            for r in range(size):
+                for c in range(size):
+                    tr, tc = forward[s][r][c]
+                    inverse[s][tr][tc] = (r, c)
+        maps = _SYMMETRY_MAPS[size] = (forward, inverse)
+    return maps
+
+_SYMMETRY_CELL_KEYS = {}
+
+def symmetry_cell_keys(size):
+    """{p: [r][c] -> 8-tuple}: the Zobrist key of a p stone on (r, c) seen in each orientation."""
+    table = _SYMMETRY_CELL_KEYS.get(size)
+    if table is None:
+        keys = zobrist_keys(size)
+        forward = symmetry_maps(size)[0]
+        table = {}
+        for k, p in ((0, "X"), (1, "O")):
+            table[p] = [[tuple(keys[forward[s][r][c][0]][forward[s][r][c][1]][k] for s in range(8))
+                         for c in range(size)] for r in range(size)]
+        _SYMMETRY_CELL_KEYS[size] = table
+    return table
+
+class SymmetryHash:
+    """
+    Zobrist keys of one position in all 8 board orientations, updated incrementally.
+    canonical() picks the smallest, so equivalent positions share one key; moves are
+    converted with to_canonical()/from_canonical() and the symmetry it reports.
+    Shared by the transposition table and the opening book.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.forward, self.inverse = symmetry_maps(size)
+        self.cell_keys = symmetry_cell_keys(size)
+        self.hashes = [0] * 8
+
+    def reset(self):
+        self.hashes = [0] * 8
+
+    def compute(self, grid):
+        """Hash grid from scratch; returns canonical()."""
+        self.reset()
+        for r, row in enumerate(grid):
+            for c, v in enumerate(row):
+                if v:
+                    self.toggle(r, c, v)
+        return self.canonical()
+
+    def toggle(self, r, c, p):
+        """Add or remove a p stone on (r, c)."""
+        self.hashes = [h ^ k for h, k in zip(self.hashes, self.cell_keys[p][r][c])]
+
+    def canonical(self):
+        """(key, s): the smallest key and the symmetry that produces it."""
+        key = min(self.hashes)
+        return key, self.hashes.index(key)
+
+    def to_canonical(self, s, r, c):
+        return self.forward[s][r][c]
+
+    def from_canonical(self, s, r, c):
+        return self.inverse[s][r][c]
+
+def canonical_key(grid):
+    """(key, s): the smallest Zobrist key over the 8 symmetric images of grid and the symmetry giving it."""
+    return SymmetryHash(len(grid)).compute(grid)
+
+# Opening book: symmetry-normalised positions -> move, in a memory-mapped file
+BOOK_FILE = os.path.join(BASE_DIR, "assets", "book", "opening.bin")
+
+class OpeningBook:
+    """
+    Known good moves for the first few plies, keyed by canonical_key().
+    File layout (little endian): header <8s magic, I slot count, H board size, H reserved>,
+    then slot count slots of <Q key, H move, H weight>. The key is canonical_key() ^ KEY_SALT
+    (the empty board's canonical key is 0) and the move is r*size+c in the canonical
+    orientation. Open addressing with linear probing; a stored key of 0 marks an empty slot.
+    The file is memory-mapped read-only and probed in place, so a lookup is O(1) and loading
+    is instant. Build or extend it with build_book.py.
+    """
+    MAGIC = b"GMKBOOK2"
+    OLD_MAGIC = b"GMKBOOK1"  # unsalted keys, still readable (rewritten as GMKBOOK2 by build_book.py)
+    KEY_SALT = 0x9E3779B97F4A7C15
+    HEADER = struct.Struct("<8sIHH")
+    SLOT = struct.Struct("<QHH")
+    MAX_STONES = 10  # positions with more stones are never looked up
+
+    def __init__(self, path=None):
+        self.path = path
+        self.slots = 0
+        self.size = 0
+        self.salt = self.KEY_SALT
+        self._file = None
+        self._mm = None
+        if path:
+            self.load(path)
+
+    def load(self, path):
+        self.close()
+        self.path = path
+        if not os.path.exists(path):
+            return False
+        try:
+            self._file = open(path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, slots, size, _ = self.HEADER.unpack_from(self._mm, 0)
+            if magic not in (self.MAGIC, self.OLD_MAGIC) or len(self._mm) < self.HEADER.size + slots * self.SLOT.size:
+                raise ValueError("bad opening book file")
+            self.salt = self.KEY_SALT if magic == self.MAGIC else 0
+            self.slots = slots
+            self.size = size
+            return True
+        except Exception as e:
+            print(f"Lỗi đọc opening book: {e}")
+            self.close()
+            return False
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._mm = None
+        self._file = None
+        self.slots = 0
+
+    def __len__(self):
+        return sum(1 for _ in self.entries())
+
+    def probe(self, key):
+        """(move, weight) stored for a canonical key, or None."""
+        key ^= self.salt
+        if not self.slots or key == 0:
+            return None
+        i = key % self.slots
+        for _ in range(self.slots):
+            k, move, weight = self.SLOT.unpack_from(self._mm, self.HEADER.size + i * self.SLOT.size)
+            if k == key:
+                return move, weight
+            if k == 0:
+                return None
+            i = (i + 1) % self.slots
+        return None
+
+    def lookup(self, grid, canon=None):
+        """
+        Book move (r, c) for the position in grid, in real board coordinates, or None.
+        canon is the position's canonical_key() when the caller already keeps it.
+        """
+        size = len(grid)
+        if not self.slots or size != self.size:
+            return None
+        stones = sum(1 for row in grid for v in row if v)
+        if stones > self.MAX_STONES:
+            return None
+        key, s = canon if canon is not None else canonical_key(grid)
+        hit = self.probe(key)
+        if hit is None:
+            return None
+        r, c = symmetry_maps(size)[1][s][hit[0] // size][hit[0] % size]
+        return (r, c) if grid[r][c] == "" else None
+
+    def entries(self):
+        """Yield (key, move, weight) for every stored position."""
+        for i in range(self.slots):
+            k, move, weight = self.SLOT.unpack_from(self._mm, self.HEADER.size + i * self.SLOT.size)
+            if k:
+                yield k ^ self.salt, move, weight
+
+    @classmethod
+    def write(cls, path, entries, size):
+        """Write {key: (move, weight)} as a book file (load factor <= 1/2), replacing path atomically."""
+        slots = 16
+        while slots < 2 * len(entries):
+            slots *= 2
+        buf = bytearray(cls.HEADER.size + slots * cls.SLOT.size)
+        cls.HEADER.pack_into(buf, 0, cls.MAGIC, slots, size, 0)
+        for key, (move, weight) in entries.items():
+            key ^= cls.KEY_SALT
+            if key == 0:
+                continue  # would read as an empty slot
+            i = key % slots
+            while cls.SLOT.unpack_from(buf, cls.HEADER.size + i * cls.SLOT.size)[0]:
+                i = (i + 1) % slots
+            cls.SLOT.pack_into(buf, cls.HEADER.size + i * cls.SLOT.size, key, move, min(weight, 0xFFFF))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf)
+        os.replace(tmp, path)
+
+# Persistent analysis cache: root search results kept across games and restarts
+ANALYSIS_FILE = os.path.join(BASE_DIR, "save", "analysis.bin")
+
+class AnalysisCache:
+    """
+    Search results keyed like the TT (canonical, seeded Zobrist key), saved on disk.
+    File layout (little endian): header <8s magic, H board size, H reserved>, then
+    append-only records <Q key, b depth, b flag, h move, d value>; for a key the last
+    record wins. Existing records are read through a read-only memory map (an index
+    key -> offset is built at load); new records are appended and kept in memory.
+    When the file grows past max_mb it is compacted to the latest record per key,
+    dropping the shallowest results first, down to 3/4 of the cap.
+    """
+    MAGIC = b"GMKCACH1"
+    HEADER = struct.Struct("<8sHH")
+    RECORD = struct.Struct("<Qbbhd")
+
+    def __init__(self, path, size, max_mb=4):
+        self.path = path
+        self.size = size
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._file = None
+        self._mm = None
+        self._index = {}    # key -> offset in the memory map
+        self._recent = {}   # key -> (depth, value, flag, move) appended since load
+        self._out = None
+        self.file_bytes = 0
+        self.load()
+
+    def load(self):
+        self.close()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if not os.path.exists(self.path) or os.path.getsize(self.path) < self.HEADER.size:
+                with open(self.path, "wb") as f:
+                    f.write(self.HEADER.pack(self.MAGIC, self.size, 0))
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, size, _ = self.HEADER.unpack_from(self._mm, 0)
+            if magic != self.MAGIC or size != self.size:
+                raise ValueError("analysis cache belongs to another board")
+            end = len(self._mm)
+            rec = self.RECORD.size
+            # a partly written last record (crash while appending) is ignored
+            end -= (end - self.HEADER.size) % rec
+            for off in range(self.HEADER.size, end, rec):
+                self._index[self.RECORD.unpack_from(self._mm, off)[0]] = off
+            self.file_bytes = end
+            self._out = open(self.path, "r+b")
+            self._out.seek(end)
+            self._out.truncate()
+        except Exception as e:
+            print(f"Lỗi đọc analysis cache: {e}")
+            self.close()
+            try:
+                # unusable file: start over
+                with open(self.path, "wb") as f:
+                    f.write(self.HEADER.pack(self.MAGIC, self.size, 0))
+                self._out = open(self.path, "ab")
+                self.file_bytes = self.HEADER.size
+            except Exception:
+                self._out = None
+
+    def close(self):
+        for f in (self._mm, self._file, self._out):
+            if f is not None:
+                try:
+                    f.close()
+                except Exception:
+                    pass
+        self._mm = self._file = self._out = None
+        self._index = {}
+        self._recent = {}
+
+    def __len__(self):
+        return len(self._index.keys() | self._recent.keys())
+
+    def probe(self, key):
+        """(depth, value, flag, move) for key, or None."""
+        hit = self._recent.get(key)
+        if hit is not None:
+            return hit
+        off = self._index.get(key)
+        if off is None:
+            return None
+        _, depth, flag, move, value = self.RECORD.unpack_from(self._mm, off)
+        return depth, value, flag, move
+
+    def store(self, key, depth, value, flag, move):
+        """Append a result unless an equally deep one is already known."""
+        if self._out is None:
+            return
+        old = self.probe(key)
+        if old is not None and old[0] >= depth:
+            return
+        try:
+            self._out.write(self.RECORD.pack(key, min(depth, 127), flag, move, value))
+            self._out.flush()
+        except Exception as e:
+            print(f"Lỗi ghi analysis cache: {e}")
+            return
+        self._recent[key] = (depth, value, flag, move)
+        self.file_bytes += self.RECORD.size
+        if self.file_bytes > self.max_bytes:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the file with the latest record per key, deepest results kept first."""
+        records = {key: self.probe(key) for key in self._index}
+        records.update(self._recent)
+        keep = (self.max_bytes * 3 // 4 - self.HEADER.size) // self.RECORD.size
+        best = sorted(records.items(), key=lambda kv: kv[1][0], reverse=True)[:max(0, keep)]
+        buf = bytearray(self.HEADER.pack(self.MAGIC, self.size, 0))
+        for key, (depth, value, flag, move) in best:
+            buf += self.RECORD.pack(key, depth, flag, move, value)
+        self.close()
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(buf)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Lỗi nén analysis cache: {e}")
+        self.load()
+
+def board_lines(board):
+    """
+    Every row, column and diagonal of the board: (lines, line_meta) where lines[i] is the
+    list of cells and line_meta[i] = (orientation, first bit, length) on the bitboards.
+    """
+    size = board.size
+    lines = []
+    line_meta = []
+    for o, (dr, dc) in enumerate([(0, 1), (1, 0), (1, 1), (1, -1)]):
+        for r0 in range(size):
+            for c0 in range(size):
+                # a line starts where the previous cell falls off the board
+                if 0 <= r0 - dr < size and 0 <= c0 - dc < size:
+                    continue
+                cells = []
+                r, c = r0, c0
+                while 0 <= r < size and 0 <= c < size:
+                    cells.append((r, c))
+                    r += dr; c += dc
+                lines.append(cells)
+                line_meta.append((o, board.bit_masks[o][r0][c0].bit_length() - 1, len(cells)))
+    return lines, line_meta
+
+class LineEvaluator:
+    """
+    Incremental pattern evaluation for HardAI.
+    Every row, column and diagonal keeps its own pattern score per player; after a move is
+    made or unmade only the (up to) four lines through that cell are rescored, so a leaf
+    evaluation is a couple of lookups instead of a full-board scan.
+    Lines are read straight from the board bitboards and scored through the pattern table,
+    so broken shapes (X.XXX, XX.XX, X.XX) are recognised.
+    """
+    def __init__(self, board, weights):
+        self.board = board
+        self.weights = weights
+        self.lines, self.line_meta = board_lines(board)
+        size = board.size
+        self.cell_lines = [[[] for _ in range(size)] for _ in range(size)]
+        self.cell_pos = [[[] for _ in range(size)] for _ in range(size)]  # (line, index in line)
+        for idx, cells in enumerate(self.lines):
+            for pos, (r, c) in enumerate(cells):
+                self.cell_lines[r][c].append(idx)
+                self.cell_pos[r][c].append((idx, pos))
+        n = len(self.lines)
+        self.line_score = {"X": [0] * n, "O": [0] * n}
+        self.line_top = {"X": [T_NONE] * n, "O": [T_NONE] * n}
+        self.total = {"X": 0, "O": 0}
+        # top_count[p][k]: number of lines whose strongest threat class for p is k
+        self.top_count = {"X": [0] * (T_FIVE + 1), "O": [0] * (T_FIVE + 1)}
+        self._memo = {}
+        self.sync()
+
+    def _line_bits(self, idx):
+        o, off, length = self.line_meta[idx]
+        mask = (1 << length) - 1
+        bits = self.board.bits
+        return (bits["X"][o] >> off) & mask, (bits["O"][o] >> off) & mask, length
+
+    def _value(self, own, opp, length):
+        """(score, strongest class) of one line for the owner of `own`."""
+        key = (own, opp, length)
+        res = self._memo.get(key)
+        if res is not None:
+            return res
+        if not own:
+            res = (0, T_NONE)
+        else:
+            w = self.weights
+            classes = line_classes(own, opp, length, self.board.win_cond)
+            counts = [0] * (T_FIVE + 1)
+            for k in classes:
+                counts[k] += 1
+            if counts[T_FIVE] >= 2:
+                score = w['OPEN4']          # two ways to complete: open four
+            elif counts[T_FIVE]:
+                score = w['CLOSED4']        # closed or broken four
+            else:
+                score = 0
+            if counts[T_OPEN4]:
+                score += w['OPEN3']         # open or split three
+            elif counts[T_FOUR]:
+                score += w['OPEN3'] // 3    # three that can only become a closed four
+            if counts[T_OPEN3] or counts[T_SPLIT3]:
+                score += w['OPEN2']
+            elif counts[T_THREE]:
+                score += w['OPEN2'] // 4
+            score += w['SINGLE'] * counts[T_TWO]
+            res = (score, max(classes))
+        if len(self._memo) >= _LINE_CACHE_LIMIT:
+            self._memo.clear()
+        self._memo[key] = res
+        return res
+
+    def _rescore(self, idx):
+        x, o, length = self._line_bits(idx)
+        for p, own, opp in (("X", x, o), ("O", o, x)):
+            score, top = self._value(own, opp, length)
+            self.total[p] += score - self.line_score[p][idx]
+            self.line_score[p][idx] = score
+            counts = self.top_count[p]
+            counts[self.line_top[p][idx]] -= 1
+            counts[top] += 1
+            self.line_top[p][idx] = top
+
+    def sync(self):
+        """Rescore every line from the board (once per search root)."""
+        n = len(self.lines)
+        for p in ("X", "O"):
+            self.line_score[p] = [0] * n
+            self.line_top[p] = [T_NONE] * n
+            self.total[p] = 0
+            self.top_count[p] = [0] * (T_FIVE + 1)
+            self.top_count[p][T_NONE] = n
+        for idx in range(n):
+            self._rescore(idx)
+
+    def update(self, r, c):
+        """Rescore the lines through (r, c) after a stone was placed or removed there."""
+        for idx in self.cell_lines[r][c]:
+            self._rescore(idx)
+
+    def top_class(self, p):
+        """Strongest threat class p could create with one move anywhere on the board."""
+        counts = self.top_count[p]
+        for k in range(T_FIVE, T_NONE, -1):
+            if counts[k]:
+                return k
+        return T_NONE
+
+    def cell_classes(self, r, c):
+        """
+        Threat classes X and O would each create on the lines through the empty cell (r, c).
+        Returns (x_classes, o_classes), one entry per line.
+        """
+        bits_x = self.board.bits["X"]
+        bits_o = self.board.bits["O"]
+        win_cond = self.board.win_cond
+        meta = self.line_meta
+        xs = []
+        os_ = []
+        for idx, pos in self.cell_pos[r][c]:
+            o, off, length = meta[idx]
+            mask = (1 << length) - 1
+            x = (bits_x[o] >> off) & mask
+            y = (bits_o[o] >> off) & mask
+            xs.append(line_classes(x, y, length, win_cond)[pos])
+            os_.append(line_classes(y, x, length, win_cond)[pos])
+        return xs, os_
+
+_THREAT_CACHE = {}
+
+def line_threats(own, opp, length, win_cond):
+    """(index, class) of the cells of a line where `own` would make at least a split three."""
+    key = (own, opp, length, win_cond)
+    res = _THREAT_CACHE.get(key)
+    if res is None:
+        if len(_THREAT_CACHE) >= _LINE_CACHE_LIMIT:
+            _THREAT_CACHE.clear()
+        res = tuple((i, k) for i, k in enumerate(line_classes(own, opp, length, win_cond)) if k >= T_SPLIT3)
+        _THREAT_CACHE[key] = res
+    return res
+
+class ThreatIndex:
+    """
+    Per-player index of the empty cells where one more stone makes five (fives) or a four
+    (fours), kept line by line from the bitboards: after a move only the (up to) four lines
+    through that cell are re-read, so immediate win and block checks are dict lookups.
+    Every line's threat cells (split three and up) are kept too, for ThreatSolver.
+    """
+    def __init__(self, board):
+        self.board = board
+        self.lines, self.line_meta = board_lines(board)
+        size = board.size
+        self.cell_lines = [[[] for _ in range(size)] for _ in range(size)]
+        for idx, cells in enumerate(self.lines):
+            for (r, c) in cells:
+                self.cell_lines[r][c].append(idx)
+        self.sync()
+
+    def _refresh_line(self, idx):
+        o, off, length = self.line_meta[idx]
+        mask = (1 << length) - 1
+        x = (self.board.bits["X"][o] >> off) & mask
+        y = (self.board.bits["O"][o] >> off) & mask
+        win_cond = self.board.win_cond
+        tx = line_threats(x, y, length, win_cond) if x else ()
+        to = line_threats(y, x, length, win_cond) if y else ()
+        # line_threats hands out one cached tuple per line state, so unchanged lines are skipped
+        old = self.line_threats["X"][idx]
+        if old is not tx:
+            self.line_threats["X"][idx] = tx
+            if old:
+                self._count("X", idx, old, -1)
+            if tx:
+                self._count("X", idx, tx, 1)
+        old = self.line_threats["O"][idx]
+        if old is not to:
+            self.line_threats["O"][idx] = to
+            if old:
+                self._count("O", idx, old, -1)
+            if to:
+                self._count("O", idx, to, 1)
+        if tx or to:
+            self.active.add(idx)
+        else:
+            self.active.discard(idx)
+
+    def _count(self, p, idx, threats, delta):
+        # fives/fours map a cell to the number of lines on which it makes that threat
+        cells = self.lines[idx]
+        for pos, k in threats:
+            if k == T_FIVE:
+                counts = self.fives[p]
+            elif k >= T_FOUR:
+                counts = self.fours[p]
+            else:
+                continue
+            cell = cells[pos]
+            n = counts.get(cell, 0) + delta
+            if n:
+                counts[cell] = n
+            else:
+                del counts[cell]
+
+    def sync(self):
+        """Re-read every line (after the board was changed from outside)."""
+        n = len(self.lines)
+        self.line_threats = {"X": [()] * n, "O": [()] * n}
+        self.active = set()  # lines with at least one threat cell for either player
+        self.fives = {"X": {}, "O": {}}
+        self.fours = {"X": {}, "O": {}}
+        for idx in range(n):
+            self._refresh_line(idx)
+
+    def update(self, r, c):
+        """Re-read the lines through (r, c) after a stone was placed or removed there."""
+        for idx in self.cell_lines[r][c]:
+            self._refresh_line(idx)
+
+    def win_cells(self, p):
+        """Cells (row-major order) where p completes a winning line, honouring the five rule."""
+        cells = sorted(self.fives[p])
+        if cells and not self.board.allow_blocked:
+            # a five closed by the opponent on both ends does not count
+            ok = []
+            for (r, c) in cells:
+                self.board.place(r, c, p)
+                if self.board.has_five(p):
+                    ok.append((r, c))
+                self.board.remove(r, c)
+            cells = ok
+        return cells
+
+    def four_cells(self, p):
+        """Cells where p makes a four (one move from five)."""
+        return list(self.fours[p])
+
+# Threat-space search: forced wins by continuous fours (VCF) and threes (VCT)
+class ThreatSolver:
+    """
+    Searches only forcing moves, so it can look far deeper than the main search.
+    VCF: the attacker plays fours until a five can no longer be stopped.
+    VCT: the attacker may also play open threes; the defender then tries every cell that
+    stops the three plus its own counter-fours.
+    Works on any Board through place/remove; threats come from a ThreatIndex, so only the
+    lines through a played cell are re-read.
+    Usable standalone: ThreatSolver(board).solve_vcf("X") -> winning move or None.
+    """
+    VCF_DEPTH = 14        # attacker moves
+    VCT_DEPTH = 6
+    MAX_NODES = 3_000     # per solve call
+
+    def __init__(self, board):
+        self.board = board
+        self.index = ThreatIndex(board)
+        self.nodes = 0
+        self.total_nodes = 0  # over all solves, for statistics
+        self._limit = self.MAX_NODES
+        self._memo = {}
+        self.cancel_event = None  # threading.Event; when set, the running solve gives up
+        self.deadline = None      # time.time() after which a solve gives up (None: node limit only)
+
+    def set_board(self, board):
+        self.board = board
+        self.index.board = board
+        self.index.sync()
+
+    def sync(self):
+        """Re-read every line (after the board was changed from outside)."""
+        self.index.sync()
+
+    def _play(self, r, c, p):
+        self.board.place(r, c, p)
+        self.index.update(r, c)
+
+    def _undo(self, r, c):
+        self.board.remove(r, c)
+        self.index.update(r, c)
+
+    def _threats(self):
+        index = self.index
+        lines = index.lines
+        lt_x = index.line_threats["X"]
+        lt_o = index.line_threats["O"]
+        tx = {}
+        to = {}
+        for idx in index.active:
+            cells = lines[idx]
+            for pos, k in lt_x[idx]:
+                if k > tx.get(cells[pos], T_NONE):
+                    tx[cells[pos]] = k
+            for pos, k in lt_o[idx]:
+                if k > to.get(cells[pos], T_NONE):
+                    to[cells[pos]] = k
+        return {"X": tx, "O": to}
+
+    def scan(self):
+        """{"X": {cell: class}, "O": {cell: class}}: every empty cell that makes a split three or better."""
+        self.sync()
+        return self._threats()
+
+    def threat_cells(self, p, min_class):
+        """{cell: strongest class} of every empty cell where p would make a threat of at least min_class."""
+        return {cell: k for cell, k in self.scan()[p].items() if k >= min_class}
+
+    def five_cells(self, p, threats=None):
+        """
+        Cells where p completes a winning line (checked against the board's five rule).
+        threats: the result of _threats() for p, meaning the index is already current.
+        """
+        if threats is None:
+            self.sync()
+        return self.index.win_cells(p)
+
+    def solve_vcf(self, attacker, max_depth=None, max_nodes=None):
+        """First move of a win by continuous fours for attacker (who is to move), or None."""
+        return self._solve(attacker, False, max_depth or self.VCF_DEPTH, max_nodes)
+
+    def solve_vct(self, attacker, max_depth=None, max_nodes=None):
+        """First move of a win by continuous fours and threes for attacker (who is to move), or None."""
+        return self._solve(attacker, True, max_depth or self.VCT_DEPTH, max_nodes)
+
+    def _solve(self, attacker, threes, depth, max_nodes):
+        self.sync()
+        self.nodes = 0
+        self._limit = max_nodes or self.MAX_NODES
+        self._memo = {}
+        defender = "O" if attacker == "X" else "X"
+        mv = None
+        # deepen gradually so short wins (e.g. a double three) are found before long lines
+        for d in range(1, depth + 1):
+            mv = self._attack(attacker, defender, threes, d)
+            if mv or self.nodes >= self._limit:
+                break
+        self.total_nodes += self.nodes
+        return mv
+
+    def _should_stop(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+        return self.deadline is not None and time.time() > self.deadline
+
+    def _key(self, threes, depth):
+        bits = self.board.bits
+        return (threes, depth) + tuple(bits["X"]) + tuple(bits["O"])
+
+    def _attack(self, a, d, threes, depth):
+        """Attacker to move: return a winning move or None."""
+        threats = self._threats()
+        fives = self.five_cells(a, threats[a])
+        if fives:
+            return fives[0]
+        if depth <= 0 or self.nodes >= self._limit:
+            return None
+        key = self._key(threes, depth)
+        if key in self._memo:
+            return self._memo[key]
+        self.nodes += 1
+        if self._should_stop():
+            # cancelled or out of time: exhaust the node budget so every level unwinds with "no win"
+            self._limit = 0
+            return None
+        blocks = self.five_cells(d, threats[d])
+        if len(blocks) > 1:
+            self._memo[key] = None
+            return None
+        if blocks:
+            # the defender threatens five: the block is forced and only helps if it is itself a threat
+            moves = blocks
+        else:
+            cand = threats[a] if threes else {mv: k for mv, k in threats[a].items() if k >= T_FOUR}
+            moves = sorted(cand, key=cand.get, reverse=True)
+        result = None
+        for (r, c) in moves:
+            self._play(r, c, a)
+            if self._defend(a, d, threes, depth - 1):
+                result = (r, c)
+            self._undo(r, c)
+            if result or self.nodes >= self._limit:
+                break
+        self._memo[key] = result
+        return result
+
+    def _defend(self, a, d, threes, depth):
+        """Defender to move after an attacking move: True if every reply still loses."""
+        self.nodes += 1
+        threats = self._threats()
+        if self.five_cells(d, threats[d]):
+            return False
+        fives = self.five_cells(a, threats[a])
+        if fives:
+            replies = self._five_stops(a, d, fives)
+            if not replies:
+                return True
+        else:
+            if not threes:
+                # a VCF move that is not a four is not forcing
+                return False
+            fours = [mv for mv, k in threats[a].items() if k >= T_FOUR]
+            if not any(threats[a][mv] == T_OPEN4 for mv in fours):
+                # not an open three: the defender may ignore it
+                return False
+            # stop the three, or counter with a four
+            replies = set(fours)
+            replies.update(mv for mv, k in threats[d].items() if k >= T_FOUR)
+        for (r, c) in replies:
+            if self.nodes >= self._limit:
+                return False
+            self._play(r, c, d)
+            won = self._attack(a, d, threes, depth)
+            self._undo(r, c)
+            if not won:
+                return False
+        return True
+
+    def _five_stops(self, a, d, fives):
+        """
+        Defender cells after which a has no five cell left. Filling a five cell always works;
+        without allow_blocked, a stone on the far end of the run that would be made can also
+        close a five on both ends, so those cells are tried as well.
+        """
+        if self.board.allow_blocked:
+            return fives if len(fives) == 1 else []
+        board = self.board
+        size = board.size
+        cands = set(fives)
+        for (r, c) in fives:
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                for s in (1, -1):
+                    rr, cc = r + s * dr, c + s * dc
+                    while 0 <= rr < size and 0 <= cc < size and board.at(rr, cc) == a:
+                        rr += s * dr
+                        cc += s * dc
+                    if 0 <= rr < size and 0 <= cc < size and board.at(rr, cc) == "":
+                        cands.add((rr, cc))
+        # a defender stone cannot give a new five cells, so only the known ones are re-checked
+        return [cell for cell in sorted(cands)
+                if not any(f != cell and self._makes_five(f, a, cell) for f in fives)]
+
+    def _makes_five(self, cell, a, cap):
+        """True if a on cell still makes a five while the defender holds cap (board untouched)."""
+        board = self.board
+        size = board.size
+        r, c = cell
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            length = 1
+            closed = 0
+            for s in (1, -1):
+                rr, cc = r + s * dr, c + s * dc
+                while 0 <= rr < size and 0 <= cc < size and (rr, cc) != cap and board.at(rr, cc) == a:
+                    length += 1
+                    rr += s * dr
+                    cc += s * dc
+                if 0 <= rr < size and 0 <= cc < size and ((rr, cc) == cap or board.at(rr, cc) not in ("", a)):
+                    closed += 1
+            if length >= board.win_cond and closed < 2:
+                return True
+        return False
+
+# Optional NumPy candidate scoring (same ranking as HardAI._quick_score_cell, whole board at once)
+class NumpyCandidateScorer:
+    """
+    Scores every empty cell near a stone in a handful of array ops.
+    The board is a flat int8 array with a border of off-board cells; precomputed gather
+    indices read, for each cell and direction, the 2*(win_cond-1) neighbours, which turn
+    into pattern-table indices with one multiply-sum. The radius-2 neighbourhood mask is a
+    dilation done the same way. Only used when numpy is installed.
+    """
+    def __init__(self, size, win_cond, attack_scores, defend_scores, radius=2):
+        self.size = size
+        half = win_cond - 1
+        pad = max(half, radius)
+        self.pad = pad
+        width = size + 2 * pad
+        self.width = width
+        cells = np.arange(size * size)
+        rows = cells // size + pad
+        cols = cells % size + pad
+        base = rows * width + cols  # padded position of every board cell
+        self.base = base
+        offsets = [k for k in range(-half, half + 1) if k != 0]
+        # gather[d, j, i]: padded position of neighbour j of cell i in direction d
+        self.gather = np.stack([
+            np.stack([base + k * (dr * width + dc) for k in offsets])
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1))
+        ])
+        self.powers = (3 ** np.arange(len(offsets))).reshape(1, 1, -1, 1)
+        # neighbourhood[i, k]: padded positions of the (2*radius+1)^2 square around cell i
+        square = [dr * width + dc for dr in range(-radius, radius + 1) for dc in range(-radius, radius + 1)]
+        self.neighbourhood = base[:, None] + np.array(square)[None, :]
+        self.table = np.frombuffer(bytes(pattern_table(win_cond)), dtype=np.uint8)
+        self.attack = np.array(attack_scores, dtype=np.int64)
+        self.defend = np.array(defend_scores, dtype=np.int64)
+        self.fork_attack = attack_scores[T_OPEN4] // 2
+        self.fork_defend = defend_scores[T_OPEN4] // 2
+        center = size // 2
+        dist = np.abs(cells // size - center) + np.abs(cells % size - center)
+        self.center_bonus = np.maximum(0, size // 2 - dist)
+        # digits seen by X, and by O (own and opponent swapped); off-board is 2 for both
+        self.board_x = np.full(width * width, 2, dtype=np.int8)
+        self.board_o = np.full(width * width, 2, dtype=np.int8)
+        self.occupied = np.zeros(width * width, dtype=bool)
+
+    def score(self, grid, player, frontier=None):
+        """
+        (cells, scores): flat indices of the empty cells within the radius of a stone and their
+        quick scores. grid is a list of rows or the padded cells bytearray of a SearchBoard
+        (read without converting); frontier (the Board's incremental set of those cells) skips
+        the dilation.
+        """
+        if isinstance(grid, (bytes, bytearray)):
+            stride = self.size + 2
+            flat = np.frombuffer(grid, dtype=np.int8).reshape(stride, stride)[1:-1, 1:-1].ravel()
+        else:
+            flat = np.array([0 if v == "" else (1 if v == "X" else 2) for row in grid for v in row], dtype=np.int8)
+        self.board_x[self.base] = flat
+        self.board_o[self.base] = (3 - flat) % 3
+        if frontier is not None:
+            size = self.size
+            cells = np.sort(np.fromiter((r * size + c for r, c in frontier), dtype=np.int64, count=len(frontier)))
+        else:
+            self.occupied[self.base] = flat != 0
+            near = self.occupied[self.neighbourhood].any(axis=1) & (flat == 0)
+            cells = np.nonzero(near)[0]
+        if not cells.size:
+            return cells, cells
+        g = self.gather[:, :, cells]
+        # classes[p, d, i] for p = X, O
+        digits = np.stack([self.board_x[g], self.board_o[g]]).astype(np.int32)
+        classes = self.table[(digits * self.powers).sum(axis=2)]
+        own, opp = (classes[0], classes[1]) if player == "X" else (classes[1], classes[0])
+        scores = self.attack[own].sum(axis=0) + self.defend[opp].sum(axis=0)
+        scores += ((own >= T_SPLIT3).sum(axis=0) >= 2) * self.fork_attack
+        scores += ((opp >= T_SPLIT3).sum(axis=0) >= 2) * self.fork_defend
+        scores += self.center_bonus[cells]
+        return cells, scores
+
 # Improved HardAI: Minimax with alpha-beta, limited candidate moves, pattern-aware heuristic and Zobrist TT
 class HardAI:
     """
@@ -781,24 +2435,52 @@ class HardAI:
     - Iterative deepening with time limit
     - Beam search (limit branching) using quick heuristic ordering
     - Zobrist TT (transposition table)
+    - PVS with aspiration windows, killer moves and a history table for ordering
+    - VCF/VCT threat-space search (ThreatSolver) before the main search
+    - Soft/hard deadlines checked every few nodes, more time when the best move is unstable,
+      and pondering on the expected reply while the opponent thinks
     Designed as a drop-in replacement for the previous HardAI.
     Tune: self.MAX_CANDIDATES, self.BEAM_WIDTH, self.TIME_LIMIT, self.max_depth
     """
-    def __init__(self, board):
-        self.board = board
+    TT_SIZE_MB = 16  # default transposition table footprint
+    MAX_PLY = 32     # killer move slots
+    CACHE_TRUST_DEPTH = 4  # cached results at least this deep are replayed without searching
+    VCF_NODES = 1_500  # threat-space search budgets (see ThreatSolver)
+    VCT_NODES = 1_500
+    TIME_CHECK_NODES = 64     # nodes between clock reads inside the search (power of two)
+    UNSTABLE_EXTENSION = 0.25  # extra share of TIME_LIMIT after an iteration changed the best move
+    HARD_TIME_FACTOR = 1.5     # never more than this many times TIME_LIMIT (reached on a root fail-low)
+    ITERATION_GROWTH = 4.0     # assumed time ratio between consecutive depths until two are measured
+    PONDER_TIME_LIMIT = 30.0  # cap on a ponder search nobody collects
+
+    # candidate scoring per threat class (indexed by T_NONE..T_FIVE)
+    ATTACK_SCORES = (0, 10, 100, 1_000, 5_000, 6_000, 8_000, 100_000, 1_000_000)
+    DEFEND_SCORES = (0, 5, 60, 500, 3_000, 4_000, 5_000, 50_000, 500_000)
+
+    def __init__(self, board, tt_size_mb=None, workers=1, book=None, cache=None, use_numpy=True, time_limit=None):
+        self.board = board.snapshot()  # private SearchBoard; set_board() takes a new one each move
+        self.book = book  # OpeningBook consulted before any search (optional)
+        self.cache = cache  # AnalysisCache shared across games (optional)
+        self.searched_depth = 0  # deepest finished iteration of the last search
+        self.searched_score = 0
+        self.searched_move = None
+        self.searched_nodes = 0  # nodes visited by the last get_move (main search + threat solver)
+        self.search_log = []  # (depth, seconds, nodes, move, score) per finished iteration of the last get_move
+        # root search processes: 1 = search in this thread, 0 = one per spare CPU core
+        self.workers = workers if workers > 0 else max(1, (os.cpu_count() or 1) - 1)
         # Base max depth for full minimax (will do iterative deepening up to this)
-        self.max_depth = 3  # keep small by default for speed; can set 4 if CPU ok
+        self.max_depth = 6  # iterative deepening goes this deep when TIME_LIMIT allows
         self.ai_char = "O"
         self.opp_char = "X"
 
         # Performance parameters (tune to trade speed vs strength)
-        self.TIME_LIMIT = 0.5        # seconds per move (iterative deepening stops when exceeded)
+        self.TIME_LIMIT = time_limit or 0.5  # seconds per move (soft deadline, see _set_deadlines)
         self.MAX_CANDIDATES = 18    # initial candidate count (top N from quick scoring)
         self.BEAM_WIDTH = 10        # number of children considered at deeper nodes (smaller -> faster)
 
-        # Zobrist table for hashing
-        self.zobrist_table = [[(random.getrandbits(64), random.getrandbits(64)) for _ in range(board.size)] for _ in range(board.size)]
-        self.tt = {}  # zobrist_key -> (stored_depth, stored_value)
+        # Zobrist hashing in all 8 orientations: the TT is keyed by the canonical (smallest) one
+        self.sym = SymmetryHash(board.size)  # XORed on every make/unmake
+        self.tt = TranspositionTable(tt_size_mb if tt_size_mb is not None else self.TT_SIZE_MB)
 
         # Pattern weights (simplified but strong enough)
         self.PATTERN_WEIGHTS = {
@@ -809,95 +2491,169 @@ class HardAI:
             'OPEN2': 100,
             'SINGLE': 5
         }
+        self.evaluator = LineEvaluator(self.board, self.PATTERN_WEIGHTS)
+        self.solver = ThreatSolver(self.board)
+        self.threats = self.solver.index  # five/four cells per player (rebuilt by set_board, kept by make_move)
+        self.board.attach(self.sym, self.evaluator, self.threats)
+        # vectorised candidate scoring when numpy is available
+        self.np_scorer = None
+        if use_numpy and np is not None:
+            self.np_scorer = NumpyCandidateScorer(board.size, board.win_cond, self.ATTACK_SCORES, self.DEFEND_SCORES)
+        self.cancel_event = None  # set by AIWorker; the search stops once it is set
+        self.pondering = False  # searching the expected reply on the opponent's time (see ponder_hit)
+        self.predicted_reply = None  # opponent move expected after the last get_move
+
+        # move ordering state: killer moves per ply and a history table per player
+        self.killers = [[None, None] for _ in range(self.MAX_PLY)]
+        self.history = {"X": [0] * (board.size * board.size), "O": [0] * (board.size * board.size)}
+        self._move_start = 0.0
+        self._soft_deadline = 0.0
+        self._hard_deadline = 0.0
+        self._deadline = 0.0  # the one the search checks: soft, or hard while the root is unstable
+        self._stop = False
+        self._nodes = 0
+
+    def set_board(self, board):
+        """Search a snapshot of board (the live Board is never touched by the search)."""
+        self.board = board.snapshot()
+        self.evaluator.board = self.board
+        self.solver.set_board(self.board)
+        self.board.attach(self.sym, self.evaluator, self.threats)
+
+    def _out_of_time(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+        return time.time() > self._deadline
+
+    def _set_deadlines(self, start):
+        """
+        Soft deadline: TIME_LIMIT after start; a stable search stops there, and no iteration
+        starts unless it is expected to finish before it (see _next_iteration_fits). The
+        threat solver gives up at the soft deadline as well. An iteration already running
+        when the best move keeps changing may go on for UNSTABLE_EXTENSION more, up to the
+        hard deadline (HARD_TIME_FACTOR * TIME_LIMIT), which a root fail-low gets at once.
+        Pondering runs until cancelled or ponder_hit().
+        """
+        if self.pondering:
+            self._soft_deadline = self._hard_deadline = start + self.PONDER_TIME_LIMIT
+        else:
+            self._soft_deadline = start + self.TIME_LIMIT
+            self._hard_deadline = start + self.TIME_LIMIT * self.HARD_TIME_FACTOR
+        self._deadline = self._soft_deadline
+        self.solver.deadline = self._soft_deadline
+
+    def _extended_deadline(self):
+        return min(self._hard_deadline, self._soft_deadline + self.TIME_LIMIT * self.UNSTABLE_EXTENSION)
+
+    def _next_iteration_fits(self, times):
+        """
+        Whether one more iteration should finish before the soft deadline, predicting its time
+        from the last finished one and how fast the iterations have been growing.
+        """
+        if not times:
+            return True
+        growth = self.ITERATION_GROWTH
+        if len(times) >= 2 and times[-2] > 0:
+            growth = min(max(times[-1] / times[-2], 2.0), 8.0)
+        return time.time() + times[-1] * growth <= self._soft_deadline
+
+    def ponder_hit(self):
+        """
+        The opponent played the predicted reply: the running ponder search becomes the real
+        search. Time already spent pondering counts towards this move (up to all of it).
+        """
+        if not self.pondering:
+            return
+        now = time.time()
+        self.pondering = False
+        self._set_deadlines(max(self._move_start, now - self.TIME_LIMIT))
+
+    @property
+    def can_ponder(self):
+        # a ponder hit re-times the search in this thread; worker processes cannot be re-timed
+        return self.workers == 1
 
     def compute_zobrist(self):
-        h = 0
-        for r in range(self.board.size):
-            for c in range(self.board.size):
-                v = self.board.grid[r][c]
-                if v == "X":
-                    h ^= self.zobrist_table[r][c][0]
-                elif v == "O":
-                    h ^= self.zobrist_table[r][c][1]
-        return h
+        """Rehash self.board from scratch; returns the canonical key."""
+        return self.sym.compute(self.board.grid)[0]
+
+    def _move_code(self, move, s):
+        """TT move code of a real move, in the orientation of symmetry s."""
+        r, c = self.sym.to_canonical(s, move[0], move[1])
+        return r * self.board.size + c
+
+    def _code_move(self, code, s):
+        """Real move for a TT move code stored in the orientation of symmetry s."""
+        return self.sym.from_canonical(s, code // self.board.size, code % self.board.size)
 
     def available_moves(self):
-        return [(r, c) for r in range(self.board.size) for c in range(self.board.size) if self.board.grid[r][c] == ""]
+        return list(self.board.empty)
 
     def find_winning_move_for(self, player_char):
-        for r in range(self.board.size):
-            for c in range(self.board.size):
-                if self.board.grid[r][c] == "":
-                    self.board.grid[r][c] = player_char
-                    winner, _, _ = self.board.check_winner_pure(self.board.grid)
-                    self.board.grid[r][c] = ""
-                    if winner == player_char:
-                        return (r, c)
-        return None
+        cells = self.threats.win_cells(player_char)
+        return cells[0] if cells else None
 
-    def _quick_score_cell(self, r, c):
+    def _quick_score_cell(self, r, c, player=None):
         """
-        Very cheap local heuristic to rank moves for candidate generation and ordering.
-        Counts adjacent stones in 4 directions, favors blocking opponent slightly.
+        Cheap pattern-table heuristic to rank moves for candidate generation and ordering,
+        from the point of view of `player` (defaults to the AI): the threat the move creates
+        plus the opponent threat it blocks on each of the 4 lines, with a bonus for double threats.
         """
+        if player is None:
+            player = self.ai_char
+        xs, os_ = self.evaluator.cell_classes(r, c)
+        own, opp = (xs, os_) if player == "X" else (os_, xs)
         s = 0
-        size = self.board.size
-        for dr, dc in [(0,1),(1,0),(1,1),(1,-1)]:
-            ai_cnt = 0
-            opp_cnt = 0
-            for k in (1,2):
-                rr = r + dr * k
-                cc = c + dc * k
-                if 0 <= rr < size and 0 <= cc < size:
-                    if self.board.grid[rr][cc] == self.ai_char:
-                        ai_cnt += 1
-                    elif self.board.grid[rr][cc] == self.opp_char:
-                        opp_cnt += 1
-                rr = r - dr * k
-                cc = c - dc * k
-                if 0 <= rr < size and 0 <= cc < size:
-                    if self.board.grid[rr][cc] == self.ai_char:
-                        ai_cnt += 1
-                    elif self.board.grid[rr][cc] == self.opp_char:
-                        opp_cnt += 1
-            s += ai_cnt * 10 - opp_cnt * 12  # prefer blocking slightly more
+        strong_own = 0
+        strong_opp = 0
+        for k in own:
+            s += self.ATTACK_SCORES[k]
+            if k >= T_SPLIT3:
+                strong_own += 1
+        for k in opp:
+            s += self.DEFEND_SCORES[k]
+            if k >= T_SPLIT3:
+                strong_opp += 1
+        if strong_own >= 2:
+            s += self.ATTACK_SCORES[T_OPEN4] // 2   # four-three / three-three fork
+        if strong_opp >= 2:
+            s += self.DEFEND_SCORES[T_OPEN4] // 2   # break the opponent's fork
         # center preference
         center = self.board.size // 2
         dist = abs(r-center) + abs(c-center)
         s += max(0, (self.board.size//2 - dist))
         return s
 
-    def _scan_runs(self, grid, player):
-        # reuse scanning logic similar to improved AI (returns runs for pattern detection)
+    def _scan_runs(self, player):
+        # runs of player's stones with their open ends, walked on the padded cells (no bounds checks)
         runs = []
-        size = self.board.size
-        dirs = [(0,1),(1,0),(1,1),(1,-1)]
-        for r in range(size):
-            for c in range(size):
-                if grid[r][c] != player:
+        board = self.board
+        cells = board.cells
+        stride = board.stride
+        v = SearchBoard.CODES[player]
+        i = cells.find(v)
+        while i >= 0:
+            for step in board.steps:
+                if cells[i - step] == v:
                     continue
-                for dr, dc in dirs:
-                    prev_r, prev_c = r - dr, c - dc
-                    if 0 <= prev_r < size and 0 <= prev_c < size and grid[prev_r][prev_c] == player:
-                        continue
-                    cnt = 1
-                    rr, cc = r + dr, c + dc
-                    while 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == player:
-                        cnt += 1
-                        rr += dr; cc += dc
-                    left_r, left_c = r - dr, c - dc
-                    right_r, right_c = rr, cc
-                    left_empty = (0 <= left_r < size and 0 <= left_c < size and grid[left_r][left_c] == "")
-                    right_empty = (0 <= right_r < size and 0 <= right_c < size and grid[right_r][right_c] == "")
-                    left_pos = (left_r, left_c) if left_empty else None
-                    right_pos = (right_r, right_c) if right_empty else None
-                    runs.append({
-                        'length': cnt,
-                        'left_empty': left_empty,
-                        'right_empty': right_empty,
-                        'left_pos': left_pos,
-                        'right_pos': right_pos
-                    })
+                cnt = 1
+                j = i + step
+                while cells[j] == v:
+                    cnt += 1
+                    j += step
+                left = i - step
+                left_empty = cells[left] == 0
+                right_empty = cells[j] == 0
+                left_pos = (left // stride - 1, left % stride - 1) if left_empty else None
+                right_pos = (j // stride - 1, j % stride - 1) if right_empty else None
+                runs.append({
+                    'length': cnt,
+                    'left_empty': left_empty,
+                    'right_empty': right_empty,
+                    'left_pos': left_pos,
+                    'right_pos': right_pos
+                })
+            i = cells.find(v, i + 1)
         return runs
 
     def find_urgent_block_cells(self):
@@ -905,7 +2661,7 @@ class HardAI:
         Returns cells that block opponent's dangerous runs (len>=3), so we can prioritize/short-circuit.
         """
         urgent = set()
-        runs = self._scan_runs(self.board.grid, self.opp_char)
+        runs = self._scan_runs(self.opp_char)
         for run in runs:
             ln = run['length']
             if ln >= 3:
@@ -920,41 +2676,53 @@ class HardAI:
         urgent.discard(None)
         return list(urgent)
 
-    def generate_candidate_moves(self, max_candidates=None):
+    def _urgent_cells(self, player):
+        """Cells where the opponent of player would make five or a four, read from the ThreatIndex."""
+        opp = self.opp_char if player == self.ai_char else self.ai_char
+        urgent = set(self.threats.fives[opp])
+        urgent.update(self.threats.fours[opp])
+        return urgent
+
+    def generate_candidate_moves(self, max_candidates=None, player=None):
         """
         Generate candidate moves around existing stones; use quick scoring and include urgent blocks.
         max_candidates overrides self.MAX_CANDIDATES if provided.
+        player is the side to move (defaults to the AI); cells are scored from its point of view.
         """
+        return [mv for mv, _ in self._scored_candidates(max_candidates, player)]
+
+    def _scored_candidates(self, max_candidates=None, player=None):
+        """generate_candidate_moves, but returning (move, quick score) pairs."""
         if max_candidates is None:
             max_candidates = self.MAX_CANDIDATES
 
         size = self.board.size
-        existing = [(r, c) for r in range(size) for c in range(size) if self.board.grid[r][c] != ""]
-        if not existing:
+        if not self.board.stone_count:
             center = size // 2
-            return [(center, center)]
+            return [((center, center), 0)]
 
-        urgent = set(self.find_urgent_block_cells())
-
-        neighbors = set()
-        R = 2
-        for (er, ec) in existing:
-            for dr in range(-R, R+1):
-                for dc in range(-R, R+1):
-                    r = er + dr
-                    c = ec + dc
-                    if 0 <= r < size and 0 <= c < size and self.board.grid[r][c] == "":
-                        neighbors.add((r, c))
-        if not neighbors:
-            neighbors = set(self.available_moves())
+        urgent = self._urgent_cells(player or self.ai_char)
 
         scored = []
-        for (r, c) in neighbors:
-            base = self._quick_score_cell(r, c)
-            if (r, c) in urgent:
-                base += 200000  # force urgent to top
-            scored.append(((r, c), base))
-        scored.sort(key=lambda x: x[1], reverse=True)
+        if self.np_scorer is not None:
+            # whole-board vectorised scoring, same values as _quick_score_cell
+            cells, scores = self.np_scorer.score(self.board.cells, player or self.ai_char, self.board.frontier)
+            for i, base in zip(cells.tolist(), scores.tolist()):
+                mv = divmod(i, size)
+                if mv in urgent:
+                    base += 200000  # force urgent to top
+                scored.append((mv, base))
+        if not scored:
+            # the board keeps the cells near stones up to date on every place/remove
+            neighbors = self.board.frontier or self.board.empty
+
+            for (r, c) in neighbors:
+                base = self._quick_score_cell(r, c, player)
+                if (r, c) in urgent:
+                    base += 200000  # force urgent to top
+                scored.append(((r, c), base))
+        # ties in row-major order, so the numpy and the pure Python path pick the same cells
+        scored.sort(key=lambda x: (-x[1], x[0]))
         candidates = [p for p, s in scored[:max_candidates]]
 
         # ensure urgent ones included (and placed at front)
@@ -966,134 +2734,235 @@ class HardAI:
             else:
                 candidates.insert(0, u)
         # unique preserve order
+        score_of = dict(scored)
         final = []
         seen = set()
         for p in candidates:
             if p not in seen and 0 <= p[0] < size and 0 <= p[1] < size:
-                final.append(p)
+                final.append((p, score_of.get(p, 200000)))
                 seen.add(p)
         return final
 
     def evaluate(self):
         """
-        Pattern-based evaluation similar to the improved AI but cheap enough for frequent calls.
+        Pattern-based evaluation read from the incrementally maintained per-line scores
+        (see LineEvaluator); SearchBoard.make_move/unmake_move keep them current.
         """
-        def score_for(player):
-            total = 0
-            runs = self._scan_runs(self.board.grid, player)
-            for run in runs:
-                cnt = run['length']
-                left_empty = run['left_empty']
-                right_empty = run['right_empty']
-                openness = 2 if left_empty and right_empty else 1 if left_empty or right_empty else 0
-                if cnt >= self.board.win_cond:
-                    w = self.PATTERN_WEIGHTS['FIVE']
-                elif cnt == 4:
-                    w = self.PATTERN_WEIGHTS['OPEN4'] if openness == 2 else self.PATTERN_WEIGHTS['CLOSED4']
-                elif cnt == 3:
-                    w = self.PATTERN_WEIGHTS['OPEN3'] if openness == 2 else (self.PATTERN_WEIGHTS['OPEN3'] // 3)
-                elif cnt == 2:
-                    w = self.PATTERN_WEIGHTS['OPEN2'] if openness == 2 else (self.PATTERN_WEIGHTS['OPEN2'] // 4)
-                elif cnt == 1:
-                    w = self.PATTERN_WEIGHTS['SINGLE']
-                else:
-                    w = 0
-                total += w
-            return total
-
-        ai_score = score_for(self.ai_char)
-        opp_score = score_for(self.opp_char)
-
-        # dynamic weighting: if opponent has runs >=3, weight defense more
-        opp_runs = self._scan_runs(self.board.grid, self.opp_char)
-        max_opp_len = 0
-        for r in opp_runs:
-            if r['length'] > max_opp_len:
-                max_opp_len = r['length']
-        if max_opp_len >= 4:
+        ai_score = self.evaluator.total[self.ai_char]
+        opp_score = self.evaluator.total[self.opp_char]
+
+        # dynamic weighting: if opponent has a four or a live three, weight defense more
+        opp_top = self.evaluator.top_class(self.opp_char)
+        if opp_top >= T_FIVE:
             opp_factor = 2.5
-        elif max_opp_len == 3:
+        elif opp_top >= T_OPEN4:
             opp_factor = 2.0
         else:
             opp_factor = 1.5
         return ai_score - opp_factor * opp_score
 
-    def _minimax(self, depth, alpha, beta, maximizing, beam_width):
+    def _order_moves(self, ordered, beam_width, tt_move, ply, mover):
+        """
+        Beam of candidate moves for a node: TT move, then killer moves, then the
+        rest by quick score with the history table as a tie-breaker.
+        """
+        ordered.sort(key=lambda x: x[1], reverse=True)
+        size = self.board.size
+        hist = self.history[mover]
+        beam = ordered[:beam_width]
+        beam.sort(key=lambda x: x[1] + hist[x[0][0] * size + x[0][1]], reverse=True)
+        moves = [mv for mv, _ in beam]
+        front = []
+        if tt_move is not None and self.board.at(tt_move[0], tt_move[1]) == "":
+            front.append(tt_move)
+        if ply < len(self.killers):
+            generated = set(mv for mv, _ in ordered)
+            for k in self.killers[ply]:
+                if k is not None and k not in front and k in generated:
+                    front.append(k)
+        if not front:
+            return moves
+        return front + [mv for mv in moves if mv not in front]
+
+    def _record_cutoff(self, move, depth, ply, mover):
+        """A quiet move refuted the line: remember it as killer and in the history table."""
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[mover][move[0] * self.board.size + move[1]] += depth * depth
+
+    def _minimax(self, depth, alpha, beta, maximizing, beam_width, last_move=None, ply=1):
         """
-        Minimax with alpha-beta and beam_width limiting child count.
-        beam_width controls how many children to expand (move ordering used).
+        Principal variation search (alpha-beta with null-window probes) and beam_width limiting child count.
+        The first (best-ordered) child gets the full window, the rest are only proven worse
+        with a null window and re-searched when they turn out better.
+        last_move is the stone just placed; only its owner is tested for five (on the bitboards).
+        When the time runs out self._stop is set and the result must be ignored.
         """
-        key = self.compute_zobrist()
-        entry = self.tt.get(key)
+        self._nodes += 1
+        if self._nodes & (self.TIME_CHECK_NODES - 1) == 0 and self._out_of_time():
+            self._stop = True
+        if self._stop:
+            return 0
+        key, sym = self.sym.canonical()
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.probe(key)
         if entry is not None:
-            stored_depth, stored_value = entry
+            stored_depth, stored_value, flag, move_code = entry
+            if move_code >= 0:
+                tt_move = self._code_move(move_code, sym)
             if stored_depth >= depth:
-                return stored_value
+                if flag == TranspositionTable.EXACT:
+                    return stored_value
+                if flag == TranspositionTable.LOWER:
+                    alpha = max(alpha, stored_value)
+                else:
+                    beta = min(beta, stored_value)
+                if alpha >= beta:
+                    return stored_value
 
-        winner, _, _ = self.board.check_winner_pure(self.board.grid)
-        if winner == self.ai_char:
-            return self.PATTERN_WEIGHTS['FIVE']
-        if winner == self.opp_char:
-            return -self.PATTERN_WEIGHTS['FIVE']
+        if last_move is not None:
+            movers = (self.board.at(last_move[0], last_move[1]),)
+        else:
+            movers = (self.ai_char, self.opp_char)
+        for p in movers:
+            if self.board.has_five(p):
+                return self.PATTERN_WEIGHTS['FIVE'] if p == self.ai_char else -self.PATTERN_WEIGHTS['FIVE']
         if depth == 0:
             val = self.evaluate()
-            self.tt[key] = (depth, val)
+            self.tt.store(key, depth, val, TranspositionTable.EXACT)
             return val
 
         # generate limited candidates for this node
         # reduce max candidates as depth increases (beam search)
         max_cand = beam_width if depth <= 1 else min(self.MAX_CANDIDATES, beam_width)
-        moves = self.generate_candidate_moves(max_candidates=max_cand)
-        if not moves:
+        mover = self.ai_char if maximizing else self.opp_char
+        ordered = self._scored_candidates(max_candidates=max_cand, player=mover)
+        if not ordered:
             return 0
+        ordered_moves = self._order_moves(ordered, beam_width, tt_move, ply, mover)
 
-        # order moves by quick eval for better pruning
-        ordered = []
-        for mv in moves:
-            r,c = mv
-            # simulate cheap: put AI's perspective for maximizing else opponent
-            self.board.grid[r][c] = self.ai_char if maximizing else self.opp_char
-            val = self._fast_partial_eval(r, c)
-            self.board.grid[r][c] = ""
-            ordered.append((mv, val))
-        ordered.sort(key=lambda x: x[1], reverse=maximizing)
-        ordered_moves = [mv for mv, _ in ordered][:beam_width]
-
+        best_move = None
         if maximizing:
             value = -inf
-            for (r, c) in ordered_moves:
-                self.board.grid[r][c] = self.ai_char
-                val = self._minimax(depth-1, alpha, beta, False, beam_width)
-                self.board.grid[r][c] = ""
+            for i, (r, c) in enumerate(ordered_moves):
+                self.board.make_move(r, c, self.ai_char)
+                if i == 0:
+                    val = self._minimax(depth-1, alpha, beta, False, beam_width, (r, c), ply + 1)
+                else:
+                    val = self._minimax(depth-1, alpha, alpha + 1, False, beam_width, (r, c), ply + 1)
+                    if alpha < val < beta and not self._stop:
+                        val = self._minimax(depth-1, val, beta, False, beam_width, (r, c), ply + 1)
+                self.board.unmake_move(r, c, self.ai_char)
+                if self._stop:
+                    return value
                 if val > value:
                     value = val
+                    best_move = (r, c)
                 alpha = max(alpha, val)
                 if alpha >= beta:
+                    self._record_cutoff((r, c), depth, ply, mover)
                     break
-            self.tt[key] = (depth, value)
-            return value
         else:
             value = inf
-            for (r, c) in ordered_moves:
-                self.board.grid[r][c] = self.opp_char
-                val = self._minimax(depth-1, alpha, beta, True, beam_width)
-                self.board.grid[r][c] = ""
+            for i, (r, c) in enumerate(ordered_moves):
+                self.board.make_move(r, c, self.opp_char)
+                if i == 0:
+                    val = self._minimax(depth-1, alpha, beta, True, beam_width, (r, c), ply + 1)
+                else:
+                    val = self._minimax(depth-1, beta - 1, beta, True, beam_width, (r, c), ply + 1)
+                    if alpha < val < beta and not self._stop:
+                        val = self._minimax(depth-1, alpha, val, True, beam_width, (r, c), ply + 1)
+                self.board.unmake_move(r, c, self.opp_char)
+                if self._stop:
+                    return value
                 if val < value:
                     value = val
+                    best_move = (r, c)
                 beta = min(beta, val)
                 if alpha >= beta:
+                    self._record_cutoff((r, c), depth, ply, mover)
                     break
-            self.tt[key] = (depth, value)
-            return value
 
-    def _fast_partial_eval(self, r, c):
+        if value <= alpha_orig:
+            flag = TranspositionTable.UPPER
+        elif value >= beta_orig:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        move_code = self._move_code(best_move, sym) if best_move else -1
+        self.tt.store(key, depth, value, flag, move_code)
+        return value
+
+    def _begin_search(self):
+        """Reset the per-move search state (node counter, stop flag, killers, aged history)."""
+        self._stop = False
+        self.killers = [[None, None] for _ in range(self.MAX_PLY)]
+        for hist in self.history.values():
+            for i, v in enumerate(hist):
+                if v:
+                    hist[i] = v >> 1
+
+    def _search_root(self, candidates, depth, alpha, beta):
         """
-        Very cheap local heuristic used for move ordering: returns heuristic value
-        based on adjacency, used only for ordering children.
+        One PVS iteration at the root. Returns (best_move, best_score); best_move is None
+        when the time ran out before the first candidate was fully searched.
         """
-        return self._quick_score_cell(r, c)
+        best_move = None
+        best_score = -inf
+        for i, (r, c) in enumerate(candidates):
+            self.board.make_move(r, c, self.ai_char)
+            if i == 0:
+                score = self._minimax(depth-1, alpha, beta, False, self.BEAM_WIDTH, (r, c))
+            else:
+                score = self._minimax(depth-1, alpha, alpha + 1, False, self.BEAM_WIDTH, (r, c))
+                if alpha < score < beta and not self._stop:
+                    score = self._minimax(depth-1, score, beta, False, self.BEAM_WIDTH, (r, c))
+            self.board.unmake_move(r, c, self.ai_char)
+            if self._stop:
+                break
+            if score > best_score:
+                best_score = score
+                best_move = (r, c)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_move, best_score
 
     def get_move(self):
+        self._move_start = time.time()
+        self._set_deadlines(self._move_start)
+        self._nodes = 0
+        self.search_log = []
+        solver_nodes = self.solver.total_nodes
+        self.solver.cancel_event = self.cancel_event
+        mv = self._select_move()
+        self.searched_nodes = self._nodes + self.solver.total_nodes - solver_nodes
+        self.predicted_reply = None
+        if mv and not (self.cancel_event is not None and self.cancel_event.is_set()):
+            self.predicted_reply = self._predict_reply(mv)
+        return mv
+
+    def _select_move(self):
+        # full rehash once per move; the search below keeps it up to date incrementally
+        self.compute_zobrist()
+        # known opening position: answer from the book without searching
+        if self.book is not None:
+            mv = self.book.lookup(self.board.grid, self.sym.canonical())
+            if mv:
+                return mv
+        # analysed deeply in an earlier game (only searched positions are cached): play it again
+        cached = None
+        if self.cache is not None:
+            key, s = self.sym.canonical()
+            cached = self.cache.probe(key)
+            if cached is not None and cached[3] >= 0 and cached[0] >= self.CACHE_TRUST_DEPTH:
+                mv = self._code_move(cached[3], s)
+                if self.board.at(mv[0], mv[1]) == "":
+                    return mv
         # Immediate win
         mv = self.find_winning_move_for(self.ai_char)
         if mv:
@@ -1103,13 +2972,26 @@ class HardAI:
         if mv:
             return mv
 
+        # forced win by continuous fours
+        mv = self.solver.solve_vcf(self.ai_char, max_nodes=self.VCF_NODES)
+        if mv:
+            return mv
+
         # urgent blocking cells (if only 1 urgent cell, play it immediately)
         urgent = self.find_urgent_block_cells()
         if len(urgent) == 1:
             return urgent[0]
 
-        # iterative deepening with time limit
-        start_time = time.time()
+        # forced win by fours and threes, unless the opponent has a faster one by fours
+        if self.solver.solve_vcf(self.opp_char, max_nodes=self.VCF_NODES) is None:
+            mv = self.solver.solve_vct(self.ai_char, max_nodes=self.VCT_NODES)
+            if mv:
+                return mv
+
+        self.evaluator.sync()
+        self.tt.new_search()
+
+        # iterative deepening until the deadlines (see _set_deadlines)
         best_move = None
         best_score = -inf
 
@@ -1119,70 +3001,262 @@ class HardAI:
             moves = self.available_moves()
             return random.choice(moves) if moves else None
 
-        # order candidates by quick heuristic
+        # order candidates by quick heuristic, TT best move (from an earlier search) first
         candidates.sort(key=lambda mv: self._quick_score_cell(mv[0], mv[1]), reverse=True)
+        root_key, root_sym = self.sym.canonical()
+        root_entry = self.tt.probe(root_key)
+        if cached is not None and (root_entry is None or root_entry[0] < cached[0]):
+            # a shallower result from an earlier game still seeds the move ordering
+            root_entry = cached
+        if root_entry is not None and root_entry[3] >= 0:
+            tt_move = self._code_move(root_entry[3], root_sym)
+            if tt_move in candidates:
+                candidates.remove(tt_move)
+                candidates.insert(0, tt_move)
+
+        self.searched_depth = 0
+        self.searched_score = 0
+        self.searched_move = None
+        if self.workers > 1:
+            best_move = self._parallel_root_search(candidates)
+            self._remember(root_key, root_sym)
+            if best_move:
+                return best_move
+            moves = self.available_moves()
+            return random.choice(moves) if moves else None
 
-        # iterative deepening from depth 1..max_depth
+        # iterative deepening from depth 1..max_depth with an aspiration window around the last score
+        self._begin_search()
+        window = self.PATTERN_WEIGHTS['OPEN3'] // 2
+        unstable = False
+        iteration_times = []
         for depth in range(1, self.max_depth + 1):
-            # if time exceeded, stop
-            if time.time() - start_time > self.TIME_LIMIT:
+            # the best move changed or the score dropped last iteration: allow some extra time
+            self._deadline = self._extended_deadline() if unstable else self._soft_deadline
+            if depth == 1:
+                # always finish one iteration, so the answer is a searched move even on a tiny budget
+                self._deadline = inf
+            # past the deadline (or the search was cancelled), or the next depth would overrun it: stop
+            if self._out_of_time() or not self._next_iteration_fits(iteration_times):
                 break
-            # try each candidate, but respect time
-            for (r, c) in candidates:
-                if time.time() - start_time > self.TIME_LIMIT:
-                    break
-                # play
-                self.board.grid[r][c] = self.ai_char
-                score = self._minimax(depth-1, -inf, inf, False, self.BEAM_WIDTH)
-                self.board.grid[r][c] = ""
-                if score is None:
-                    continue
-                if score > best_score:
-                    best_score = score
-                    best_move = (r, c)
+            started = time.time()
+            if best_move is None:
+                alpha, beta = -inf, inf
+            else:
+                alpha, beta = best_score - window, best_score + window
+            move, score = self._search_root(candidates, depth, alpha, beta)
+            if not self._stop and (score <= alpha or score >= beta):
+                if score <= alpha:
+                    # failing low: the expected line is refuted, take extra time to find a better one
+                    self._deadline = self._hard_deadline
+                # fell outside the window: search this depth again with a full window
+                move, score = self._search_root(candidates, depth, -inf, inf)
+            if move is None:
+                break
+            # an unfinished iteration still counts when its best move beat the previous best
+            if self._stop and best_move is not None and move != best_move and score <= best_score:
+                break
+            unstable = best_move is not None and (move != best_move or score < best_score - window)
+            best_move, best_score = move, score
+            # remember the root best move so the next iteration searches it first
+            self.tt.store(root_key, depth, best_score, TranspositionTable.EXACT, self._move_code(best_move, root_sym))
+            candidates.remove(best_move)
+            candidates.insert(0, best_move)
+            if self._stop:
+                break
+            self.searched_depth = depth
+            self.searched_score = best_score
+            self.searched_move = best_move
+            self.search_log.append((depth, time.time() - self._move_start, self._nodes, best_move, best_score))
+            iteration_times.append(time.time() - started)
             # small optimization: if we found a forced win, break early
             if best_score >= self.PATTERN_WEIGHTS['OPEN4']:
                 break
 
+        self._remember(root_key, root_sym)
         # fallback
         if best_move:
             return best_move
         moves = self.available_moves()
         return random.choice(moves) if moves else None
 
+    def _predict_reply(self, move):
+        """Opponent's expected answer to move: the TT best move after it, else its top candidate."""
+        r, c = move
+        if self.board.at(r, c) != "":
+            return None
+        self.compute_zobrist()
+        self.board.make_move(r, c, self.ai_char)
+        reply = None
+        if not self.board.has_five(self.ai_char):
+            key, s = self.sym.canonical()
+            entry = self.tt.probe(key)
+            if entry is not None and entry[3] >= 0:
+                reply = self._code_move(entry[3], s)
+            if reply is None or self.board.at(reply[0], reply[1]) != "":
+                moves = self.generate_candidate_moves(max_candidates=1, player=self.opp_char)
+                reply = moves[0] if moves else None
+        self.board.unmake_move(r, c, self.ai_char)
+        return reply
+
+    def _remember(self, root_key, root_sym):
+        """Save the deepest finished root result to the persistent analysis cache."""
+        if self.cache is None or self.searched_move is None:
+            return
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return
+        self.cache.store(root_key, self.searched_depth, self.searched_score, TranspositionTable.EXACT,
+                         self._move_code(self.searched_move, root_sym))
+
+    def search_root_moves(self, moves, depth, deadline):
+        """Score each root move at the given depth (stops early at the deadline)."""
+        self._deadline = deadline
+        self._begin_search()
+        results = []
+        for (r, c) in moves:
+            self.board.make_move(r, c, self.ai_char)
+            score = self._minimax(depth-1, -inf, inf, False, self.BEAM_WIDTH, (r, c))
+            self.board.unmake_move(r, c, self.ai_char)
+            if self._stop:
+                break
+            results.append(((r, c), score))
+        return results
+
+    def _parallel_root_search(self, candidates):
+        """
+        Iterative deepening with the root candidates split across worker processes.
+        Each worker keeps its own board copy and transposition table between calls;
+        with more cores every depth finishes sooner, so deeper iterations fit in TIME_LIMIT.
+        Workers get the deadline with the task, so they are not re-timed by ponder_hit.
+        """
+        pool = get_root_pool(self.workers)
+        size = self.board.size
+        cells = bytes(self.board.cells)
+        # everything the worker engine needs to score moves the way this one does
+        config = (size, self.board.win_cond, self.board.allow_blocked, max(1, int(self.tt.size_mb) // self.workers),
+                  self.ai_char, self.opp_char, self.MAX_CANDIDATES, self.BEAM_WIDTH, self.np_scorer is not None)
+        # extra iteration per doubling of cores; the time limit still caps the search
+        max_depth = self.max_depth + (self.workers.bit_length() - 1)
+        root_key, root_sym = self.sym.canonical()
+        best_move = None
+        best_score = -inf
+        unstable = False
+        iteration_times = []
+        for depth in range(1, max_depth + 1):
+            self._deadline = self._extended_deadline() if unstable else self._soft_deadline
+            if depth == 1:
+                self._deadline = inf
+            if self._out_of_time() or not self._next_iteration_fits(iteration_times):
+                break
+            started = time.time()
+            # deal candidates round-robin so every worker gets some of the best-ordered moves
+            chunks = [candidates[i::self.workers] for i in range(self.workers)]
+            futures = [pool.submit(_root_search_task, config, cells, chunk, depth, self._deadline)
+                       for chunk in chunks if chunk]
+            results = []
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=0.05)
+                for f in done:
+                    try:
+                        res, nodes = f.result()
+                        results.extend(res)
+                        self._nodes += nodes
+                    except Exception as e:
+                        print(f"Lỗi AI worker: {e}")
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    return best_move
+            previous = best_move
+            for mv, score in results:
+                if score > best_score:
+                    best_score = score
+                    best_move = mv
+            unstable = previous is not None and best_move != previous
+            if len(results) == len(candidates):
+                self.searched_depth = depth
+                self.searched_score = best_score
+                self.searched_move = best_move
+                self.search_log.append((depth, time.time() - self._move_start, self._nodes, best_move, best_score))
+                iteration_times.append(time.time() - started)
+            if best_move:
+                self.tt.store(root_key, depth, best_score, TranspositionTable.EXACT, self._move_code(best_move, root_sym))
+                candidates.remove(best_move)
+                candidates.insert(0, best_move)
+            if best_score >= self.PATTERN_WEIGHTS['OPEN4']:
+                break
+        return best_move
+
+# Process pool for HardAI's parallel root search (created on first use)
+_ROOT_POOL = None
+_ROOT_POOL_WORKERS = 0
+_WORKER_AI = {}  # per worker process: config (board rules, side, tuning) -> HardAI
+
+def get_root_pool(workers):
+    global _ROOT_POOL, _ROOT_POOL_WORKERS
+    if _ROOT_POOL is None or _ROOT_POOL_WORKERS != workers:
+        shutdown_root_pool()
+        _ROOT_POOL = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        _ROOT_POOL_WORKERS = workers
+    return _ROOT_POOL
+
+def shutdown_root_pool():
+    global _ROOT_POOL
+    if _ROOT_POOL is not None:
+        _ROOT_POOL.shutdown(wait=False, cancel_futures=True)
+        _ROOT_POOL = None
+
+def _root_search_task(config, cells, moves, depth, deadline):
+    """Runs in a worker process: search the given root moves on a private board copy."""
+    size, win_cond, allow_blocked, tt_mb, ai_char, opp_char, max_candidates, beam_width, use_numpy = config
+    ai = _WORKER_AI.get(config)
+    if ai is None:
+        ai = _WORKER_AI[config] = HardAI(Board(size, win_cond, allow_blocked), tt_size_mb=tt_mb, use_numpy=use_numpy)
+        ai.ai_char = ai_char
+        ai.opp_char = opp_char
+        ai.MAX_CANDIDATES = max_candidates
+        ai.BEAM_WIDTH = beam_width
+    ai.board.load(cells)
+    ai.compute_zobrist()
+    ai.evaluator.sync()
+    ai.threats.sync()
+    ai.tt.new_search()
+    ai._nodes = 0
+    results = ai.search_root_moves(moves, depth, deadline)
+    return results, ai._nodes
+
 # EasyAI: keep it 'easy' but with simple heuristics so it doesn't play totally random
 class EasyAI:
     def __init__(self, board):
-        self.board = board
+        self.set_board(board)
         self.ai_char = "O"
         self.opp_char = "X"
 
+    def set_board(self, board):
+        self.board = board.copy()
+        self.threats = ThreatIndex(self.board)
+
     def find_winning_move_for(self, player_char):
-        for r in range(self.board.size):
-            for c in range(self.board.size):
-                if self.board.grid[r][c] == "":
-                    self.board.grid[r][c] = player_char
-                    winner, _, _ = self.board.check_winner_pure(self.board.grid)
-                    self.board.grid[r][c] = ""
-                    if winner == player_char:
-                        return (r, c)
-        return None
+        cells = self.threats.win_cells(player_char)
+        return cells[0] if cells else None
 
     def nearby_moves(self, radius=2):
-        size = self.board.size
-        existing = [(r, c) for r in range(size) for c in range(size) if self.board.grid[r][c] != ""]
-        if not existing:
-            center = size // 2
+        if not self.board.stone_count:
+            center = self.board.size // 2
             return [(center, center)]
-        cand = set()
-        for er, ec in existing:
-            for dr in range(-radius, radius+1):
-                for dc in range(-radius, radius+1):
-                    r = er + dr
-                    c = ec + dc
-                    if 0 <= r < size and 0 <= c < size and self.board.grid[r][c] == "":
-                        cand.add((r, c))
-        return list(cand) if cand else [(r, c) for r in range(size) for c in range(size) if self.board.grid[r][c] == ""]
+        if radius == self.board.FRONTIER_RADIUS:
+            cand = self.board.frontier
+        else:
+            size = self.board.size
+            existing = [(r, c) for r in range(size) for c in range(size) if self.board.grid[r][c] != ""]
+            cand = set()
+            for er, ec in existing:
+                for dr in range(-radius, radius+1):
+                    for dc in range(-radius, radius+1):
+                        r = er + dr
+                        c = ec + dc
+                        if 0 <= r < size and 0 <= c < size and self.board.grid[r][c] == "":
+                            cand.add((r, c))
+        return list(cand) if cand else list(self.board.empty)
 
     def score_move_simple(self, r, c):
         # simple score: count adjacent O and X in radius 1
@@ -1213,7 +3287,7 @@ class EasyAI:
 
         moves = self.nearby_moves()
         if not moves:
-            moves = [(r, c) for r in range(self.board.size) for c in range(self.board.size) if self.board.grid[r][c] == ""]
+            moves = list(self.board.empty)
 
         # score candidates simply and pick best usually; sometimes pick random to stay 'easy'
         scored = [(self.score_move_simple(r, c), (r, c)) for (r, c) in moves]
@@ -1225,18 +3299,91 @@ class EasyAI:
             top = [p for s, p in scored[:6]] if len(scored) >= 6 else [p for s, p in scored]
             return random.choice(top) if top else None
 
+# Background AI thinking so the UI keeps rendering during the search
+class AIWorker:
+    """
+    Runs ai.get_move() on a daemon thread against a snapshot of the board.
+    The result comes back through result_queue, which Game polls once per frame.
+    Each job has an id so a cancelled search can never deliver a stale move.
+    A ponder job searches an expected position on the opponent's time; Game either turns
+    it into the real search (HardAI.ponder_hit) or cancels it.
+    """
+    def __init__(self):
+        self.result_queue = queue.Queue()
+        self.thread = None
+        self.job_id = 0
+        self.cancel_event = threading.Event()
+
+    @property
+    def busy(self):
+        return self.thread is not None
+
+    def start(self, ai, board, ponder=False):
+        self.cancel()
+        self.job_id += 1
+        job_id = self.job_id
+        self.cancel_event = threading.Event()
+        ai.set_board(board)  # each AI searches its own snapshot
+        ai.cancel_event = self.cancel_event
+        if isinstance(ai, HardAI):
+            ai.pondering = ponder
+
+        def work():
+            try:
+                mv = ai.get_move()
+            except Exception as e:
+                print(f"Lỗi AI: {e}")
+                mv = None
+            self.result_queue.put((job_id, mv))
+
+        self.thread = threading.Thread(target=work, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Stop the running search (if any) and drop its result."""
+        self.cancel_event.set()
+        if self.thread is not None:
+            # the AI object is reused by the next job, so wait for the old search to unwind
+            self.thread.join()
+            self.thread = None
+        self.job_id += 1
+        while not self.result_queue.empty():
+            try:
+                self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def poll(self):
+        """Return (True, move) once the current job has finished, else (False, None)."""
+        while not self.result_queue.empty():
+            job_id, mv = self.result_queue.get_nowait()
+            if job_id == self.job_id:
+                self.thread = None
+                return True, mv
+        return False, None
+
 # ======================= GAME CLASS ==========================================
 class Game:
     REMATCH_TIMEOUT_MS = 10000
     DRAW_OFFER_TIMEOUT_MS = 10000
+    AI_MIN_DELAY_MS = 150  # the AI never answers faster than this
 
     TROPHY_RECT = pygame.Rect(Config.WIDTH-110, Config.HEIGHT-110, 80, 80)
 
     def __init__(self, screen, clock):
-        self.screen = screen
+        self.screen = screen  # draw target: the window, or shake_buffer while the screen shakes
+        self.display = screen
         self.clock = clock
         self.board = Board(Config.BOARD_SIZE, Config.WIN_CONDITION, Config.ALLOW_BLOCKED_WIN)
         self.ai = None
+        self.ai_worker = AIWorker()
+        self.opening_book = OpeningBook(BOOK_FILE)
+        self.analysis_cache = None  # opened on the first Hard AI game (see ai_cache setting)
+        self.ai_thinking = False
+        self.ai_think_started = 0
+        self.ai_pending_move = None
+        self.ponder_move = None  # human reply HardAI is pondering on (None: not pondering)
+        self.ai_failed_at = None  # move count at which neither the AI nor the fallback found a move
         self.ai_level = "hard"
         self.lang = "vi"
         self.music_on = True
@@ -1279,6 +3426,12 @@ class Game:
         # SCREEN SHAKE
         self.shake_offset = [0, 0]
         self.shake_intensity = 0
+        self.shake_buffer = None  # back buffer shaking frames are drawn into, allocated on the first shake
+
+        # dirty-rect rendering: partial display updates only between two quiet game frames
+        self.last_frame_quiet = False
+        # frame pacing: event that ended an idle wait, handled first in the next frame
+        self.pending_event = None
 
         # TRASH TALK
         self.final_trash_talk = ""
@@ -1293,7 +3446,7 @@ class Game:
         self.flash_interval = 300
         self.last_flash_time = 0
 
-        self.particles = []
+        self.particles = ParticleSystem()
         self.leaderboard = Leaderboard()
         self.show_save_prompt = False
         self.player_name_input = ""
@@ -1317,6 +3470,7 @@ class Game:
         self.leaderboard_rect = pygame.Rect(0, 0, 1, 1)
         self.tutorial_rect = pygame.Rect(0, 0, 1, 1)
         self.lang_rect = pygame.Rect(0, 0, 1, 1)
+        self.battery_rect = pygame.Rect(0, 0, 1, 1)
         self.quit_rect = pygame.Rect(0, 0, 1, 1)
 
         self.easy_ai_rect = pygame.Rect(0, 0, 1, 1)
@@ -1405,18 +3559,13 @@ class Game:
         for r, c in target_cells:
             center = self.board.pixel_center(r, c)
             color = Config.X_COLOR if self.winner == "X" else Config.O_COLOR
-            for _ in range(30):
-                self.particles.append(Particle(center[0], center[1], color))
+            self.particles.emit(center[0], center[1], color, 30)
 
     def update_particles(self):
-        for p in self.particles[:]:
-            p.update()
-            if p.life <= 0:
-                self.particles.remove(p)
+        self.particles.update()
 
     def draw_particles(self):
-        for p in self.particles:
-            p.draw(self.screen)
+        self.particles.draw(self.screen)
 
     def trigger_screen_shake(self, intensity=10):
         self.shake_intensity = intensity
@@ -1431,12 +3580,41 @@ class Game:
         else:
             self.shake_offset = [0, 0]
 
-    def apply_shake_offset(self, surface):
-        if self.shake_offset != [0, 0]:
-            temp = pygame.Surface((Config.WIDTH, Config.HEIGHT))
-            temp.blit(surface, self.shake_offset)
-            return temp
-        return surface
+    def frame_is_quiet(self):
+        """True when nothing but the board and the bottom bar is drawn this frame (no overlay, effect or shake)."""
+        if self.state != "game":
+            return False
+        if self.particles or self.shake_offset != [0, 0] or self.board.winning_line or self.center_message:
+            return False
+        if self.rematch_incoming or self.draw_offer_incoming or self.show_save_prompt or self.achievement_popup:
+            return False
+        if self.online_mode:
+            now = pygame.time.get_ticks()
+            if self.typing_chat or any(now - item['time'] <= self.chat_timeout for item in self.chat_history):
+                return False
+        return True
+
+    def begin_shake_frame(self):
+        """While shaking, the frame is drawn into the persistent shake_buffer instead of the window."""
+        if self.shake_offset == [0, 0]:
+            return
+        if self.shake_buffer is None:
+            self.shake_buffer = pygame.Surface(self.display.get_size())
+        self.screen = self.shake_buffer
+
+    def apply_shake_offset(self):
+        """Present a frame drawn into shake_buffer with one blit at shake_offset."""
+        if self.screen is self.display:
+            return
+        self.screen = self.display
+        dx, dy = self.shake_offset
+        self.display.blit(self.shake_buffer, (dx, dy))
+        # uncovered edges are black, as before
+        w, h = self.display.get_size()
+        if dx:
+            self.display.fill((0, 0, 0), (0 if dx > 0 else w + dx, 0, abs(dx), h))
+        if dy:
+            self.display.fill((0, 0, 0), (0, 0 if dy > 0 else h + dy, w, abs(dy)))
 
     def get_trash_talk_message(self):
         quotes = Config.VICTORY_QUOTES_VI if self.lang == "vi" else Config.VICTORY_QUOTES_EN
@@ -1450,12 +3628,13 @@ class Game:
         return msg.format(winner=winner_name, loser=loser_name)
 
     def reset_game(self, ai_mode=False, online_mode=False):
+        self.cancel_ai()
         self.board.reset()
         self.player = "X"
         self.game_over = False
         self.winner = None
         self.move_history = []
-        self.particles = []
+        self.particles.clear()
         self.flash_phase = 0
         self.ai_enabled = ai_mode
         self.online_mode = online_mode
@@ -1496,7 +3675,12 @@ class Game:
             if self.ai_level == "easy":
                 self.ai = EasyAI(self.board)
             else:
-                self.ai = HardAI(self.board)
+                self.ai = HardAI(self.board, tt_size_mb=self.settings.get("ai_tt_mb", HardAI.TT_SIZE_MB),
+                                 workers=self.settings.get("ai_workers", 1),
+                                 book=self.opening_book if self.settings.get("ai_book", True) else None,
+                                 cache=self.get_analysis_cache(),
+                                 use_numpy=self.settings.get("ai_numpy", True),
+                                 time_limit=self.settings.get("ai_time_ms", 500) / 1000)
         else:
             self.ai = None
         self.start_music()
@@ -1506,12 +3690,16 @@ class Game:
             return
         if self.game_over or not self.move_history:
             return
+        if self.ai_thinking:
+            # the AI's reply is pending: undoing now would take back one of its earlier moves
+            return
+        self.cancel_ai()
 
         def pop_one():
             if not self.move_history:
                 return
             r, c = self.move_history.pop()
-            self.board.grid[r][c] = ""
+            self.board.remove(r, c)
             if (r, c) in self.board.place_animations:
                 del self.board.place_animations[(r, c)]
 
@@ -1525,6 +3713,7 @@ class Game:
         self.play_click()
 
     def go_to_menu(self):
+        self.cancel_ai()
         self.state = "menu"
         self.show_save_prompt = False
         self.cached_player_name = None
@@ -1637,12 +3826,13 @@ class Game:
 
     def start_new_round(self):
         # note: rematch logic for LAN handled externally
+        self.cancel_ai()
         self.board.reset()
         self.player = "X"
         self.game_over = False
         self.winner = None
         self.move_history = []
-        self.particles = []
+        self.particles.clear()
         self.flash_phase = 0
         self.rematch_requested = False
         self.rematch_timer = 0
@@ -1685,17 +3875,17 @@ class Game:
         pygame.draw.rect(s, (220, 200, 120) if self.achievement_popup["legendary"] else (240, 240, 240), (0,0,box_w,box_h), 2, border_radius=8)
 
         # icon left
-        icon_text = Config.FONT_BIG.render(self.achievement_popup["icon"], True, (255, 215, 0))
+        icon_text = GLYPHS.render(Config.FONT_BIG, self.achievement_popup["icon"], (255, 215, 0))
         s.blit(icon_text, (18, box_h//2 - icon_text.get_height()//2))
 
         # title (gold if legendary)
         title_color = (255, 215, 0) if self.achievement_popup["legendary"] else (255, 255, 255)
         title_font = Config.FONT_UI_MSG
-        title_surf = title_font.render(self.achievement_popup["title"], True, title_color)
+        title_surf = GLYPHS.render(title_font, self.achievement_popup["title"], title_color)
         s.blit(title_surf, (110, 20))
 
         reason_font = Config.FONT_UI_SMALL
-        reason_surf = reason_font.render(self.achievement_popup["reason"], True, (200, 200, 200))
+        reason_surf = GLYPHS.render(reason_font, self.achievement_popup["reason"], (200, 200, 200))
         s.blit(reason_surf, (110, 60))
 
         self.screen.blit(s, (box_x, box_y))
@@ -1719,7 +3909,7 @@ class Game:
         pygame.draw.rect(trophy_surf, (40, 40, 40, alpha), (0, 0, rect.width, rect.height), border_radius=12)
 
         # icon
-        icon = Config.FONT_BIG.render("[ACH]", True, (255, 215, 0))
+        icon = GLYPHS.render(Config.FONT_BIG, "[ACH]", (255, 215, 0))
         trophy_surf.blit(icon, (rect.width//2 - icon.get_width()//2, rect.height//2 - icon.get_height()//2 - 4))
 
         # small badge if there are new unlocked achievements (we'll show gold dot)
@@ -1739,7 +3929,7 @@ class Game:
 
     def draw_menu(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("title"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("title"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 20))
         btn_w, btn_h = 300, 45
         start_y = 90
@@ -1750,7 +3940,8 @@ class Game:
         self.leaderboard_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, start_y + 3*(btn_h + gap), btn_w, btn_h)
         self.tutorial_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, start_y + 4*(btn_h + gap), btn_w, btn_h)
         self.lang_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, start_y + 5*(btn_h + gap), btn_w, btn_h)
-        self.quit_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, start_y + 6*(btn_h + gap), btn_w, btn_h)
+        self.battery_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, start_y + 6*(btn_h + gap), btn_w, btn_h)
+        self.quit_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, start_y + 7*(btn_h + gap), btn_w, btn_h)
 
         buttons = [
             (self.play_rect, "play_2p"),
@@ -1759,6 +3950,7 @@ class Game:
             (self.leaderboard_rect, "leaderboard"),
             (self.tutorial_rect, "tutorial"),
             (self.lang_rect, None),
+            (self.battery_rect, "battery_btn"),
             (self.quit_rect, "quit")
         ]
 
@@ -1767,14 +3959,20 @@ class Game:
             pygame.draw.rect(self.screen, Config.WOOD_BORDER, rect, 2)
             if key is None:
                 lang_display = "Tiếng Việt" if self.lang == "vi" else "ENGLISH"
-                txt = Config.FONT_UI_MED.render(f"{self.get_text('lang_btn')} {lang_display}", True, Config.BTN_TEXT)
+                txt = GLYPHS.render(Config.FONT_UI_MED, f"{self.get_text('lang_btn')} {lang_display}", Config.BTN_TEXT)
             else:
                 txt_str = self.get_text(key)
                 if key == "play_2p":
                     txt_str = f"{txt_str} ({Config.BOARD_SIZE}x{Config.BOARD_SIZE})"
-                txt = Config.FONT_UI_MED.render(txt_str, True, Config.BTN_TEXT)
+                elif key == "battery_btn":
+                    on = self.settings.get("battery_saver", False)
+                    if self.lang == "vi":
+                        txt_str = f"{txt_str} {'Bật' if on else 'Tắt'}"
+                    else:
+                        txt_str = f"{txt_str} {'On' if on else 'Off'}"
+                txt = GLYPHS.render(Config.FONT_UI_MED, txt_str, Config.BTN_TEXT)
             self.screen.blit(txt, (rect.centerx - txt.get_width() // 2, rect.centery - txt.get_height() // 2))
-        hint = Config.FONT_UI_SMALL.render(self.get_text("hint"), True, Config.GRID_LINE)
+        hint = GLYPHS.render(Config.FONT_UI_SMALL, self.get_text("hint"), Config.GRID_LINE)
         self.screen.blit(hint, (Config.WIDTH // 2 - hint.get_width() // 2, Config.HEIGHT - 30))
 
         # trophy (achievements) icon bottom-right
@@ -1782,19 +3980,19 @@ class Game:
 
     def draw_input_name_lan(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("enter_name_lan"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("enter_name_lan"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 200))
         box = pygame.Rect(Config.WIDTH//2 - 150, 260, 300, 50)
         pygame.draw.rect(self.screen, (255, 255, 255), box)
         pygame.draw.rect(self.screen, Config.WOOD_BORDER, box, 2)
-        txt = Config.FONT_UI_MED.render(self.input_name_lan_str, True, (0,0,0))
+        txt = GLYPHS.render(Config.FONT_UI_MED, self.input_name_lan_str, (0,0,0))
         self.screen.blit(txt, (box.x + 10, box.y + 10))
-        hint = Config.FONT_UI_SMALL.render("ENTER: OK | ESC: Back", True, Config.GRID_LINE)
+        hint = GLYPHS.render(Config.FONT_UI_SMALL, "ENTER: OK | ESC: Back", Config.GRID_LINE)
         self.screen.blit(hint, (Config.WIDTH // 2 - hint.get_width() // 2, 330))
 
     def draw_online_select(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("online_title"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("online_title"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 40))
 
         btn_w, btn_h = 350, 60
@@ -1805,12 +4003,12 @@ class Game:
         for rect, txt_key in [(self.host_rect, "host_game"), (self.join_rect, "join_game"), (self.back_online_rect, "menu_back")]:
             pygame.draw.rect(self.screen, Config.BTN_BG, rect)
             pygame.draw.rect(self.screen, Config.WOOD_BORDER, rect, 2)
-            txt = Config.FONT_UI_MED.render(self.get_text(txt_key), True, Config.BTN_TEXT)
+            txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text(txt_key), Config.BTN_TEXT)
             self.screen.blit(txt, (rect.centerx - txt.get_width() // 2, rect.centery - txt.get_height() // 2))
 
     def draw_input_ip(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("enter_ip"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("enter_ip"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 100))
 
         box_w, box_h = 300, 50
@@ -1818,34 +4016,34 @@ class Game:
         pygame.draw.rect(self.screen, (255, 255, 255), input_box)
         pygame.draw.rect(self.screen, Config.WOOD_BORDER, input_box, 2)
 
-        txt = Config.FONT_UI_MED.render(self.input_ip, True, Config.BTN_TEXT)
+        txt = GLYPHS.render(Config.FONT_UI_MED, self.input_ip, Config.BTN_TEXT)
         self.screen.blit(txt, (input_box.x + 10, input_box.y + 10))
 
-        hint = Config.FONT_UI_SMALL.render("Enter: Connect | Esc: Back", True, Config.GRID_LINE)
+        hint = GLYPHS.render(Config.FONT_UI_SMALL, "Enter: Connect | Esc: Back", Config.GRID_LINE)
         self.screen.blit(hint, (Config.WIDTH // 2 - hint.get_width() // 2, 250))
 
         if self.error_msg:
-            err = Config.FONT_UI_SMALL.render(self.error_msg, True, Config.X_COLOR)
+            err = GLYPHS.render(Config.FONT_UI_SMALL, self.error_msg, Config.X_COLOR)
             self.screen.blit(err, (Config.WIDTH // 2 - err.get_width() // 2, 300))
 
     def draw_waiting(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("waiting_conn"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("waiting_conn"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 120))
 
         ip_txt = f"{self.get_text('your_ip')} {self.network.get_local_ip()}"
-        sub = Config.FONT_UI_MED.render(ip_txt, True, Config.O_COLOR)
+        sub = GLYPHS.render(Config.FONT_UI_MED, ip_txt, Config.O_COLOR)
         self.screen.blit(sub, (Config.WIDTH // 2 - sub.get_width() // 2, 180))
 
-        name_txt = Config.FONT_UI_SMALL.render(f"Playing as: {self.my_name}", True, Config.BTN_TEXT)
+        name_txt = GLYPHS.render(Config.FONT_UI_SMALL, f"Playing as: {self.my_name}", Config.BTN_TEXT)
         self.screen.blit(name_txt, (Config.WIDTH // 2 - name_txt.get_width() // 2, 230))
 
-        hint = Config.FONT_UI_SMALL.render("Esc: Cancel", True, Config.GRID_LINE)
+        hint = GLYPHS.render(Config.FONT_UI_SMALL, "Esc: Cancel", Config.GRID_LINE)
         self.screen.blit(hint, (Config.WIDTH // 2 - hint.get_width() // 2, 300))
 
     def draw_ai_select(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("ai_select_title"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("ai_select_title"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 26))
         btn_w, btn_h = 350, 60
         self.easy_ai_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, 120, btn_w, btn_h)
@@ -1857,19 +4055,19 @@ class Game:
             pygame.draw.rect(self.screen, Config.HIGHLIGHT_LINE, self.hard_ai_rect.inflate(8, 8), 4)
         for rect in [self.easy_ai_rect, self.hard_ai_rect, self.back_ai_rect]:
             pygame.draw.rect(self.screen, Config.BTN_BG, rect)
-        easy_txt = Config.FONT_UI_MED.render(self.get_text("ai_easy"), True, Config.BTN_TEXT)
-        hard_txt = Config.FONT_UI_MED.render(self.get_text("ai_hard"), True, Config.BTN_TEXT)
-        back_txt = Config.FONT_UI_MED.render(self.get_text("menu_back"), True, Config.BTN_TEXT)
+        easy_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("ai_easy"), Config.BTN_TEXT)
+        hard_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("ai_hard"), Config.BTN_TEXT)
+        back_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("menu_back"), Config.BTN_TEXT)
         for txt, rect in [(easy_txt, self.easy_ai_rect), (hard_txt, self.hard_ai_rect), (back_txt, self.back_ai_rect)]:
             self.screen.blit(txt, (rect.centerx - txt.get_width() // 2, rect.y + (btn_h - txt.get_height()) // 2))
 
     def draw_leaderboard(self):
         self.screen.fill(Config.BG_COLOR)
-        title = Config.FONT_UI_MSG.render(self.get_text("leaderboard_title"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("leaderboard_title"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 20))
         top_scores = self.leaderboard.scores
         if not top_scores:
-            no_score_txt = Config.FONT_UI_MED.render(self.get_text("no_scores"), True, Config.MSG_COLOR)
+            no_score_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("no_scores"), Config.MSG_COLOR)
             self.screen.blit(no_score_txt, (Config.WIDTH // 2 - no_score_txt.get_width() // 2, 150))
         else:
             y = 80
@@ -1877,7 +4075,7 @@ class Game:
             headers = [self.get_text("rank"), self.get_text("name"), self.get_text("total"), self.get_text("mode"), self.get_text("date")]
             x_positions = [20, 70, 190, 270, 370]
             for i, header in enumerate(headers):
-                txt = header_font.render(header, True, Config.GRID_LINE)
+                txt = GLYPHS.render(header_font, header, Config.GRID_LINE)
                 self.screen.blit(txt, (x_positions[i], y))
             pygame.draw.line(self.screen, Config.WOOD_BORDER, (15, y + 25), (Config.WIDTH - 15, y + 25), 2)
             y = 115
@@ -1892,36 +4090,36 @@ class Game:
                     bg_rect = pygame.Rect(15, y - 5, Config.WIDTH - 30, 25)
                     pygame.draw.rect(self.screen, Config.SCORE_BG, bg_rect)
                 for i, text in enumerate(data):
-                    txt = Config.FONT_UI_SMALL.render(str(text), True, Config.BTN_TEXT)
+                    txt = GLYPHS.render(Config.FONT_UI_SMALL, str(text), Config.BTN_TEXT)
                     self.screen.blit(txt, (x_positions[i], y))
                 y += 30
         btn_w, btn_h = 200, 50
         self.back_leaderboard_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, Config.HEIGHT - 70, btn_w, btn_h)
         pygame.draw.rect(self.screen, Config.BTN_BG, self.back_leaderboard_rect)
-        back_txt = Config.FONT_UI_MED.render(self.get_text("back"), True, Config.BTN_TEXT)
+        back_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("back"), Config.BTN_TEXT)
         self.screen.blit(back_txt, (self.back_leaderboard_rect.centerx - back_txt.get_width() // 2, self.back_leaderboard_rect.centery - back_txt.get_height() // 2))
 
     def draw_tutorial(self):
         self.screen.fill(Config.TUTORIAL_BG)
-        title = Config.FONT_UI_MSG.render(self.get_text("tutorial_title"), True, Config.GRID_LINE)
+        title = GLYPHS.render(Config.FONT_UI_MSG, self.get_text("tutorial_title"), Config.GRID_LINE)
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 15))
         y = 65
         sections = [("tut_1", "tut_1_desc"), ("tut_2", "tut_2_desc"), ("tut_3", "tut_3_desc"), ("tut_chat", "tut_chat_desc"), ("tut_4", "tut_4_desc")]
         for title_key, desc_key in sections:
-            title_txt = Config.FONT_UI_MED.render(self.get_text(title_key), True, Config.MSG_COLOR)
+            title_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text(title_key), Config.MSG_COLOR)
             self.screen.blit(title_txt, (20, y))
             y += 25
             desc = self.get_text(desc_key)
             lines = desc.split('\n')
             for line in lines:
-                line_txt = Config.FONT_UI_SMALL.render(line, True, Config.TUTORIAL_TEXT)
+                line_txt = GLYPHS.render(Config.FONT_UI_SMALL, line, Config.TUTORIAL_TEXT)
                 self.screen.blit(line_txt, (30, y))
                 y += 20
             y += 10
         btn_w, btn_h = 200, 50
         self.back_tutorial_rect = pygame.Rect(Config.WIDTH // 2 - btn_w // 2, Config.HEIGHT - 70, btn_w, btn_h)
         pygame.draw.rect(self.screen, Config.BTN_BG, self.back_tutorial_rect)
-        back_txt = Config.FONT_UI_MED.render(self.get_text("back"), True, Config.BTN_TEXT)
+        back_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("back"), Config.BTN_TEXT)
         self.screen.blit(back_txt, (self.back_tutorial_rect.centerx - back_txt.get_width() // 2, self.back_tutorial_rect.centery - back_txt.get_height() // 2))
 
     def draw_chat(self):
@@ -1934,7 +4132,7 @@ class Game:
             if pygame.time.get_ticks() % 1000 < 500:
                 txt_display += "|"
 
-            txt_surf = Config.FONT_CHAT.render(txt_display, True, Config.CHAT_TEXT)
+            txt_surf = GLYPHS.render(Config.FONT_CHAT, txt_display, Config.CHAT_TEXT)
             self.screen.blit(txt_surf, (input_rect.x + 5, input_rect.y + 5))
 
         if self.chat_history:
@@ -1951,7 +4149,7 @@ class Game:
 
                 msg = item['text']
                 color = (0, 0, 100) if "Bạn" in msg else (100, 0, 0)
-                txt_surf = Config.FONT_CHAT.render(msg, True, color)
+                txt_surf = GLYPHS.render(Config.FONT_CHAT, msg, color)
 
                 bg_rect = txt_surf.get_rect(bottomleft=(10, start_y))
                 bg_rect.inflate_ip(10, 4)
@@ -1979,9 +4177,9 @@ class Game:
 
         seconds = max(0, self.rematch_timer_ms // 1000)
         msg = self.get_text("rematch_request").format(name=self.rematch_requester if self.rematch_requester else self.opp_name)
-        txt = Config.FONT_UI_MED.render(msg, True, (255, 255, 255))
+        txt = GLYPHS.render(Config.FONT_UI_MED, msg, (255, 255, 255))
         sub_txt_str = self.get_text("rematch_accept").format(sec=seconds)
-        sub_txt = Config.FONT_UI_SMALL.render(sub_txt_str, True, (255, 255, 255))
+        sub_txt = GLYPHS.render(Config.FONT_UI_SMALL, sub_txt_str, (255, 255, 255))
         self.screen.blit(txt, (box_x + box_w//2 - txt.get_width()//2, box_y + 30))
         self.screen.blit(sub_txt, (box_x + box_w//2 - sub_txt.get_width()//2, box_y + 90))
 
@@ -2000,9 +4198,9 @@ class Game:
 
         seconds = max(0, self.draw_offer_timer_ms // 1000)
         msg = self.get_text("draw_offer").format(name=self.draw_offer_requester if self.draw_offer_requester else self.opp_name)
-        txt = Config.FONT_UI_MED.render(msg, True, (255, 255, 255))
+        txt = GLYPHS.render(Config.FONT_UI_MED, msg, (255, 255, 255))
         sub_txt_str = self.get_text("draw_offer_accept").format(sec=seconds)
-        sub_txt = Config.FONT_UI_SMALL.render(sub_txt_str, True, (255, 255, 255))
+        sub_txt = GLYPHS.render(Config.FONT_UI_SMALL, sub_txt_str, (255, 255, 255))
         self.screen.blit(txt, (box_x + box_w//2 - txt.get_width()//2, box_y + 30))
         self.screen.blit(sub_txt, (box_x + box_w//2 - sub_txt.get_width()//2, box_y + 90))
 
@@ -2025,7 +4223,7 @@ class Game:
         if self.lang == "vi":
             music_txt = "Nhạc: Bật" if self.music_on else "Nhạc: Tắt"
 
-        undo_disabled = self.game_over or not self.move_history or self.online_mode
+        undo_disabled = self.game_over or not self.move_history or self.online_mode or self.ai_thinking
 
         buttons = [
             (self.menuback_rect, "menu_back", False),
@@ -2037,14 +4235,14 @@ class Game:
             color = (180, 160, 140) if disabled else Config.BTN_BG
             pygame.draw.rect(self.screen, color, rect)
             txt_str = key if key == music_txt else self.get_text(key)
-            txt = Config.FONT_UI_SMALL.render(txt_str, True, Config.BTN_TEXT)
+            txt = GLYPHS.render(Config.FONT_UI_SMALL, txt_str, Config.BTN_TEXT)
             self.screen.blit(txt, (rect.centerx - txt.get_width() // 2, rect.centery - txt.get_height() // 2))
 
         # Restart only when NOT online
         if not self.online_mode:
             self.restart_rect = pygame.Rect(start_x + 3*btn_w + 3*gap, btn_y, btn_w, btn_h)
             pygame.draw.rect(self.screen, Config.BTN_BG, self.restart_rect)
-            txt = Config.FONT_UI_SMALL.render(self.get_text("restart"), True, Config.BTN_TEXT)
+            txt = GLYPHS.render(Config.FONT_UI_SMALL, self.get_text("restart"), Config.BTN_TEXT)
             self.screen.blit(txt, (self.restart_rect.centerx - txt.get_width() // 2, self.restart_rect.centery - txt.get_height() // 2))
         else:
             # create a dummy rect so clicks don't crash
@@ -2060,7 +4258,7 @@ class Game:
             color = Config.BTN_BG
         pygame.draw.rect(self.screen, color, self.offer_draw_rect)
         pygame.draw.rect(self.screen, Config.WOOD_BORDER, self.offer_draw_rect, 2)
-        o_txt = Config.FONT_UI_SMALL.render(offer_txt, True, Config.BTN_TEXT)
+        o_txt = GLYPHS.render(Config.FONT_UI_SMALL, offer_txt, Config.BTN_TEXT)
         self.screen.blit(o_txt, (self.offer_draw_rect.centerx - o_txt.get_width() // 2, self.offer_draw_rect.centery - o_txt.get_height() // 2))
 
         msg_y = bar_y + 10
@@ -2068,21 +4266,25 @@ class Game:
         name_o = self.my_name if (self.online_mode and self.online_role == "O") else (self.opp_name if self.online_mode else "O")
 
         score_str = f"{name_x}: {self.scores['X']}  |  {name_o}: {self.scores['O']}"
-        score_surf = Config.FONT_UI_MED.render(score_str, True, Config.BTN_TEXT)
+        score_surf = GLYPHS.render(Config.FONT_UI_MED, score_str, Config.BTN_TEXT)
         score_bg_rect = score_surf.get_rect(topleft=(20, msg_y))
         pygame.draw.rect(self.screen, Config.SCORE_BG, score_bg_rect.inflate(10, 6))
         self.screen.blit(score_surf, score_bg_rect)
 
         if self.online_mode:
             role_txt = f"{self.get_text('you_are')} {self.online_role} ({self.my_name})"
-            role_surf = Config.FONT_UI_SMALL.render(role_txt, True, Config.MSG_COLOR)
+            role_surf = GLYPHS.render(Config.FONT_UI_SMALL, role_txt, Config.MSG_COLOR)
             self.screen.blit(role_surf, (Config.WIDTH - role_surf.get_width() - 20, msg_y))
 
         if not self.game_over:
             turn_msg = f"{self.get_text('turn_of')} {self.player}"
+            if self.ai_thinking:
+                dots = "." * (1 + (pygame.time.get_ticks() // 300) % 3)
+                turn_msg = f"{turn_msg} - {self.get_text('ai_thinking')}{dots}"
             if self.typing_chat:
                 turn_msg = "CHAT..."
-            msg_surf = Config.FONT_UI_MED.render(turn_msg, True, Config.MSG_COLOR)
+            msg_surf = GLYPHS.render(Config.FONT_UI_MED, turn_msg, Config.MSG_COLOR)
+            self.screen.blit(msg_surf, (20, msg_y + 32))
         else:
             # Show rematch button in LAN: only loser can request rematch
             if self.online_mode:
@@ -2092,7 +4294,7 @@ class Game:
                     self.rematch_btn_rect = pygame.Rect(Config.WIDTH - btn_w2 - 20, bar_y + 70, btn_w2, btn_h2)
                     pygame.draw.rect(self.screen, (50, 200, 50), self.rematch_btn_rect)
                     pygame.draw.rect(self.screen, Config.WOOD_BORDER, self.rematch_btn_rect, 2)
-                    txt = Config.FONT_UI_SMALL.render(self.get_text("rematch_btn"), True, (255, 255, 255))
+                    txt = GLYPHS.render(Config.FONT_UI_SMALL, self.get_text("rematch_btn"), (255, 255, 255))
                     self.screen.blit(txt, (self.rematch_btn_rect.centerx - txt.get_width()//2, self.rematch_btn_rect.centery - txt.get_height()//2))
                 else:
                     # dummy rect
@@ -2104,7 +4306,7 @@ class Game:
                     self.rematch_btn_rect = pygame.Rect(Config.WIDTH - btn_w2 - 20, bar_y + 70, btn_w2, btn_h2)
                     pygame.draw.rect(self.screen, (50, 200, 50), self.rematch_btn_rect)
                     pygame.draw.rect(self.screen, Config.WOOD_BORDER, self.rematch_btn_rect, 2)
-                    txt = Config.FONT_UI_SMALL.render(self.get_text("rematch_btn"), True, (255, 255, 255))
+                    txt = GLYPHS.render(Config.FONT_UI_SMALL, self.get_text("rematch_btn"), (255, 255, 255))
                     self.screen.blit(txt, (self.rematch_btn_rect.centerx - txt.get_width()//2, self.rematch_btn_rect.centery - txt.get_height()//2))
 
             if self.final_trash_talk:
@@ -2115,12 +4317,12 @@ class Game:
                     msg = self.final_trash_talk
                 else:
                     msg = self.get_text("draw")
-            msg_surf = Config.FONT_UI_MSG.render(msg, True, Config.MSG_COLOR)
+            msg_surf = GLYPHS.render(Config.FONT_UI_MSG, msg, Config.MSG_COLOR)
             self.screen.blit(msg_surf, (Config.WIDTH // 2 - msg_surf.get_width() // 2, msg_y))
 
         # show waiting_for_response if set (for rematch sender)
         if self.waiting_for_response:
-            wait_txt = Config.FONT_UI_SMALL.render(self.get_text("waiting_response"), True, Config.O_COLOR)
+            wait_txt = GLYPHS.render(Config.FONT_UI_SMALL, self.get_text("waiting_response"), Config.O_COLOR)
             self.screen.blit(wait_txt, (Config.WIDTH - wait_txt.get_width() - 20, bar_y + 80))
 
         if self.show_save_prompt:
@@ -2137,14 +4339,14 @@ class Game:
         box_y = (Config.HEIGHT - box_h) // 2
         pygame.draw.rect(self.screen, Config.TUTORIAL_BG, (box_x, box_y, box_w, box_h))
         pygame.draw.rect(self.screen, Config.WOOD_BORDER, (box_x, box_y, box_w, box_h), 3)
-        prompt_txt = Config.FONT_UI_MED.render(self.get_text("save_score_prompt"), True, Config.BTN_TEXT)
+        prompt_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("save_score_prompt"), Config.BTN_TEXT)
         self.screen.blit(prompt_txt, (box_x + box_w // 2 - prompt_txt.get_width() // 2, box_y + 20))
         input_box = pygame.Rect(box_x + 25, box_y + 60, box_w - 50, 35)
         pygame.draw.rect(self.screen, (255, 255, 255), input_box)
         pygame.draw.rect(self.screen, Config.WOOD_BORDER, input_box, 2)
-        input_txt = Config.FONT_UI_MED.render(self.player_name_input, True, Config.BTN_TEXT)
+        input_txt = GLYPHS.render(Config.FONT_UI_MED, self.player_name_input, Config.BTN_TEXT)
         self.screen.blit(input_txt, (input_box.x + 5, input_box.y + 5))
-        hint = Config.FONT_UI_SMALL.render("Enter: Save | Esc: Cancel", True, Config.BTN_TEXT)
+        hint = GLYPHS.render(Config.FONT_UI_SMALL, "Enter: Save | Esc: Cancel", Config.BTN_TEXT)
         self.screen.blit(hint, (box_x + box_w // 2 - hint.get_width() // 2, box_y + 110))
 
     # Achievements helper list
@@ -2161,13 +4363,13 @@ class Game:
     def draw_achievements_menu(self):
         self.screen.fill((24, 24, 28))
         title_text = "THÀNH TỰU" if self.lang == "vi" else "ACHIEVEMENTS"
-        title = Config.FONT_UI_MSG.render(title_text, True, (255, 255, 255))
+        title = GLYPHS.render(Config.FONT_UI_MSG, title_text, (255, 255, 255))
         self.screen.blit(title, (Config.WIDTH // 2 - title.get_width() // 2, 20))
 
         # back button
         back_rect = pygame.Rect(20, Config.HEIGHT - 70, 200, 50)
         pygame.draw.rect(self.screen, Config.BTN_BG, back_rect)
-        back_txt = Config.FONT_UI_MED.render(self.get_text("back"), True, Config.BTN_TEXT)
+        back_txt = GLYPHS.render(Config.FONT_UI_MED, self.get_text("back"), Config.BTN_TEXT)
         self.screen.blit(back_txt, (back_rect.centerx - back_txt.get_width() // 2, back_rect.centery - back_txt.get_height() // 2))
 
         # compute area & content
@@ -2211,7 +4413,7 @@ class Game:
 
             # draw only if inside visible region (clip_surface coordinates)
             if y + item_h > 0 and y < available_h:
-                name_surf = Config.FONT_UI_MED.render(f"{icon} {name}", True, color)
+                name_surf = GLYPHS.render(Config.FONT_UI_MED, f"{icon} {name}", color)
                 clip_surface.blit(name_surf, (padding_x, y))
 
                 if unlocked:
@@ -2231,7 +4433,7 @@ class Game:
                 else:
                     reason = "Đã Khóa" if self.lang == "vi" else "Locked"
 
-                reason_surf = Config.FONT_UI_SMALL.render(reason, True, (200,200,200) if unlocked else (100,100,100))
+                reason_surf = GLYPHS.render(Config.FONT_UI_SMALL, reason, (200,200,200) if unlocked else (100,100,100))
                 clip_surface.blit(reason_surf, (padding_x + 10, y + 34))
 
             y += item_h
@@ -2273,7 +4475,7 @@ class Game:
             if self.player != self.online_role:
                 return
 
-        self.board.grid[row][col] = self.player
+        self.board.place(row, col, self.player)
         self.move_history.append((row, col))
         self.board.place_animations[(row, col)] = (pygame.time.get_ticks(), 250)
         self.play_click()
@@ -2284,8 +4486,8 @@ class Game:
             except:
                 pass
 
-        self.winner = self.board.check_winner()
-        if self.winner or all(self.board.grid[r][c] != "" for r in range(self.board.size) for c in range(self.board.size)):
+        self.winner = self.board.check_winner((row, col))
+        if self.winner or not self.board.empty:
             self.game_over = True
             self.play_end_sound()
             if self.winner:
@@ -2325,13 +4527,82 @@ class Game:
             self.player = "O" if self.player == "X" else "X"
 
     def handle_ai_move(self):
-        if self.ai_enabled and not self.game_over and self.player == "O" and self.ai:
-            pygame.time.delay(150)
-            mv = self.ai.get_move()
-            if mv:
-                self.handle_place_move(mv[0], mv[1])
+        if self.game_over and self.ponder_move is not None:
+            self.cancel_ai()
+        if not (self.ai_enabled and not self.game_over and self.player == "O" and self.ai):
+            return
+        if self.ai_failed_at == len(self.move_history):
+            return
+        if not self.ai_thinking:
+            self.ai_thinking = True
+            self.ai_think_started = pygame.time.get_ticks()
+            self.ai_pending_move = None
+            if self.ponder_move is not None and self.move_history and self.move_history[-1] == self.ponder_move:
+                # the predicted reply was played: the ponder search carries on as this move's search
+                self.ai.ponder_hit()
+            else:
+                self.ai_worker.start(self.ai, self.board)
+            self.ponder_move = None
+            return
+        if self.ai_pending_move is None:
+            done, mv = self.ai_worker.poll()
+            if not done:
+                return
+            if not mv:
+                # the engine failed: answer with EasyAI instead of restarting the search every frame
+                print("Lỗi AI: không tìm được nước đi, dùng EasyAI")
+                fallback = EasyAI(self.board)
+                mv = fallback.get_move()
+                if not mv or self.board.grid[mv[0]][mv[1]] != "":
+                    print("Lỗi AI: EasyAI cũng không tìm được nước đi")
+                    self.ai_failed_at = len(self.move_history)
+                    self.ai_thinking = False
+                    return
+            self.ai_pending_move = mv
+        # keep the short pause the AI always had before answering
+        if pygame.time.get_ticks() - self.ai_think_started < self.AI_MIN_DELAY_MS:
+            return
+        mv = self.ai_pending_move
+        self.ai_thinking = False
+        self.ai_pending_move = None
+        self.handle_place_move(mv[0], mv[1])
+        self.start_ponder()
+
+    def start_ponder(self):
+        """Let HardAI search its predicted human reply while the human thinks (setting ai_ponder)."""
+        if self.game_over or not isinstance(self.ai, HardAI) or not self.ai.can_ponder:
+            return
+        if not self.settings.get("ai_ponder", True):
+            return
+        mv = self.ai.predicted_reply
+        if mv is None or self.board.grid[mv[0]][mv[1]] != "":
+            return
+        board = self.board.copy()
+        board.place(mv[0], mv[1], self.player)
+        self.ai_worker.start(self.ai, board, ponder=True)
+        self.ponder_move = mv
+
+    def get_analysis_cache(self):
+        """The persistent AnalysisCache, or None when disabled in settings."""
+        if not self.settings.get("ai_cache", True):
+            return None
+        if self.analysis_cache is None:
+            self.analysis_cache = AnalysisCache(ANALYSIS_FILE, Config.BOARD_SIZE, self.settings.get("ai_cache_mb", 4))
+        return self.analysis_cache
+
+    def cancel_ai(self):
+        """Abort a running AI search or ponder (undo, restart, back to menu)."""
+        if self.ai_thinking or self.ai_worker.busy:
+            self.ai_worker.cancel()
+        self.ai_thinking = False
+        self.ai_pending_move = None
+        self.ponder_move = None
+        self.ai_failed_at = None
 
     def handle_event(self, event):
+        if event.type == pygame.VIDEOEXPOSE:
+            # window uncovered or restored: the next frame must repaint everything
+            self.last_frame_quiet = False
         if event.type == pygame.QUIT:
             # If quitting during LAN game -> notify opponent and (only if it's our turn) apply penalty
             if self.online_mode and not self.game_over:
@@ -2607,6 +4878,8 @@ class Game:
                     self.go_to_tutorial()
                 elif self.lang_rect.collidepoint(mx, my):
                     self.lang = "en" if self.lang == "vi" else "vi"
+                elif self.battery_rect.collidepoint(mx, my):
+                    self.toggle_battery_saver()
                 elif self.quit_rect.collidepoint(mx, my):
                     return False
 
@@ -2728,6 +5001,44 @@ class Game:
                         self.handle_place_move(row, col)
         return True
 
+    def toggle_battery_saver(self):
+        settings = load_settings()
+        settings["battery_saver"] = not self.settings.get("battery_saver", False)
+        save_settings(settings)
+        self.settings["battery_saver"] = settings["battery_saver"]
+
+    def frame_rates(self):
+        """(full, idle) frames per second from the max_fps and battery_saver settings."""
+        max_fps = max(1, int(self.settings.get("max_fps", Config.FPS)))
+        if self.settings.get("battery_saver", False):
+            return min(max_fps, Config.SAVER_FPS), min(max_fps, Config.SAVER_IDLE_FPS)
+        return max_fps, min(max_fps, Config.IDLE_FPS)
+
+    def is_animating(self):
+        """True while something moves on screen or the AI's answer is awaited: those frames run at the full rate."""
+        if self.particles or self.shake_intensity > 0 or self.shake_offset != [0, 0]:
+            return True
+        if self.flash_phase > 0 or self.ai_thinking or self.recent_unlock_pulse > 0:
+            return True
+        if self.achievement_popup and pygame.time.get_ticks() <= self.achievement_popup["end_time"]:
+            return True
+        if self.state == "menu":
+            return True  # the trophy icon always pulses
+        return self.state == "game" and bool(self.board.place_animations)
+
+    def pace_frame(self):
+        """
+        Wait for the next frame and return the ms since the previous one. While animating this
+        is clock.tick at the full rate; otherwise the loop sleeps in pygame.event.wait until
+        input, a network message or the idle tick, so static screens cost a few wake-ups a second.
+        """
+        max_fps, idle_fps = self.frame_rates()
+        if not self.is_animating() and not pygame.event.peek():
+            event = pygame.event.wait(1000 // idle_fps)
+            if event.type != pygame.NOEVENT:
+                self.pending_event = event
+        return self.clock.tick(max_fps)
+
     def update_flash(self):
         if self.flash_phase > 0:
             now = pygame.time.get_ticks()
@@ -2740,7 +5051,7 @@ class Game:
     def draw_center_message(self):
         if not self.center_message:
             return
-        txt = Config.FONT_UI_MSG.render(self.center_message, True, Config.MSG_COLOR)
+        txt = GLYPHS.render(Config.FONT_UI_MSG, self.center_message, Config.MSG_COLOR)
         self.screen.blit(txt, (Config.WIDTH // 2 - txt.get_width() // 2, Config.HEIGHT // 2 - txt.get_height() // 2))
 
     # Achievement menu drawing
@@ -2752,8 +5063,8 @@ class Game:
         self.start_music()
         running = True
         while running:
-            # FPS cap and dt
-            dt = self.clock.tick(Config.FPS)
+            # FPS cap and dt: full rate while animating, idle rate otherwise
+            dt = self.pace_frame()
 
             # process network queue for waiting/online states
             if self.state == "waiting" or self.online_mode:
@@ -2948,7 +5259,12 @@ class Game:
 
             # ------------------------------------------------------------------
 
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            if self.pending_event is not None:
+                # the event that woke an idle wait comes first
+                events.insert(0, self.pending_event)
+                self.pending_event = None
+            for event in events:
                 if not self.handle_event(event):
                     running = False
                     break
@@ -2993,6 +5309,10 @@ class Game:
             self.update_screen_shake()
 
             mouse_pos = pygame.mouse.get_pos()
+            quiet = self.frame_is_quiet()
+            full = not (quiet and self.last_frame_quiet)
+            dirty = []
+            self.begin_shake_frame()
 
             if self.state == "menu":
                 self.draw_menu()
@@ -3013,7 +5333,7 @@ class Game:
             elif self.state == "achievements":
                 self.draw_achievements_menu()
             elif self.state == "game":
-                self.board.draw(self.screen, self.state, self.player, mouse_pos)
+                dirty = self.board.draw(self.screen, self.state, self.player, mouse_pos, full=full)
                 self.draw_control()
                 self.board.draw_highlight(self.screen, self.flash_phase)
                 self.draw_particles()
@@ -3029,8 +5349,7 @@ class Game:
             self.draw_achievement_popup()
 
             # apply shake
-            final_surface = self.apply_shake_offset(self.screen.copy())
-            self.screen.blit(final_surface, (0, 0))
+            self.apply_shake_offset()
 
             # update center message timer
             if self.center_message_time > 0:
@@ -3039,7 +5358,14 @@ class Game:
                     self.center_message = ""
                     self.center_message_time = 0
 
-            pygame.display.flip()
+            if full:
+                pygame.display.flip()
+            else:
+                # the bottom bar is redrawn every frame (turn text, thinking dots)
+                bar_y = Config.BOARD_SIZE * Config.CELL_SIZE
+                dirty.append(pygame.Rect(0, bar_y, Config.WIDTH, Config.HEIGHT - bar_y))
+                pygame.display.update(dirty)
+            self.last_frame_quiet = quiet
 
         # On exit make sure to notify opponent if we intentionally left during a game
         try:
@@ -3052,6 +5378,10 @@ class Game:
             pass
 
         self.network.close()
+        self.cancel_ai()
+        shutdown_root_pool()
+        if self.analysis_cache is not None:
+            self.analysis_cache.close()
         pygame.quit()
         sys.exit()
 
@@ -3063,6 +5393,7 @@ except ImportError:
         pass
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     if not os.path.exists("assets"):
         print("Cảnh báo: Không tìm thấy thư mục 'assets'.")
 
@@ -0,0 +1,201 @@
+"""
+Headless engine-vs-engine matches, to measure HardAI / EasyAI strength and speed
+without going through the pygame UI.
+
+    python selfplay.py --a hard --b easy --games 40
+    python selfplay.py --a hard:time=0.5 --b hard:time=0.2,depth=4 --games 100 --jobs 4
+
+Engine spec: "easy" or "hard", optionally followed by ":" and comma-separated options
+(HardAI only): time (seconds per move), depth (max_depth), tt (MB), beam, cand
+(MAX_CANDIDATES), numpy (0/1), book (0/1).
+Engines swap colours every game and start from a few random stones near the centre
+(--opening). Games run in parallel processes (--jobs). The report gives A's score,
+an Elo difference estimate with a 95% interval (unbounded after a clean sweep),
+HardAI nodes per second and per-move latency percentiles.
+"""
+import argparse
+import concurrent.futures
+import math
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import Board, Config, EasyAI, HardAI, OpeningBook, BOOK_FILE
+
+OPTION_TYPES = {"time": float, "depth": int, "tt": int, "beam": int, "cand": int, "numpy": int, "book": int}
+
+
+def parse_spec(spec):
+    """"hard:time=0.5,depth=4" -> ("hard", {"time": 0.5, "depth": 4})"""
+    kind, _, rest = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind not in ("easy", "hard"):
+        raise argparse.ArgumentTypeError(f"unknown engine '{kind}' (easy or hard)")
+    options = {}
+    for item in filter(None, rest.split(",")):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in OPTION_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown option '{name}' in '{spec}'")
+        options[name] = OPTION_TYPES[name](value)
+    return kind, options
+
+
+def make_engine(spec, board, char):
+    kind, options = spec
+    if kind == "easy":
+        ai = EasyAI(board)
+    else:
+        book = OpeningBook(BOOK_FILE) if options.get("book", 0) else None
+        ai = HardAI(board, tt_size_mb=options.get("tt"), book=book,
+                    use_numpy=bool(options.get("numpy", 1)), time_limit=options.get("time"))
+        if "depth" in options:
+            ai.max_depth = options["depth"]
+        if "beam" in options:
+            ai.BEAM_WIDTH = options["beam"]
+        if "cand" in options:
+            ai.MAX_CANDIDATES = options["cand"]
+    ai.ai_char = char
+    ai.opp_char = "O" if char == "X" else "X"
+    return ai
+
+
+def play_game(spec_a, spec_b, a_is_x, seed, opening):
+    """One game in a worker process. Returns the winner ("A", "B" or None) and per-engine stats."""
+    rng = random.Random(seed)
+    board = Board(Config.BOARD_SIZE, Config.WIN_CONDITION, Config.ALLOW_BLOCKED_WIN)
+    a_char = "X" if a_is_x else "O"
+    b_char = "O" if a_is_x else "X"
+    engines = {a_char: ("A", make_engine(spec_a, board, a_char)),
+               b_char: ("B", make_engine(spec_b, board, b_char))}
+    stats = {"A": {"times": [], "nodes": 0, "search_time": 0.0},
+             "B": {"times": [], "nodes": 0, "search_time": 0.0}}
+    center = board.size // 2
+    near = [(r, c) for r in range(center - 2, center + 3) for c in range(center - 2, center + 3)]
+    p = "X"
+    winner = None
+    for turn in range(board.size * board.size):
+        if turn < opening:
+            mv = rng.choice([cell for cell in near if board.grid[cell[0]][cell[1]] == ""])
+        else:
+            tag, ai = engines[p]
+            ai.set_board(board)
+            t = time.perf_counter()
+            mv = ai.get_move()
+            dt = time.perf_counter() - t
+            stats[tag]["times"].append(dt)
+            if isinstance(ai, HardAI):
+                stats[tag]["nodes"] += ai.searched_nodes
+                stats[tag]["search_time"] += dt
+            if not mv or board.grid[mv[0]][mv[1]] != "":
+                # no move or an illegal one loses the game
+                winner = "B" if tag == "A" else "A"
+                break
+        board.place(mv[0], mv[1], p)
+        if board.check_winner_at(board.grid, mv[0], mv[1])[0]:
+            if turn >= opening:
+                winner = engines[p][0]
+            break
+        if not board.empty:
+            break
+        p = "O" if p == "X" else "X"
+    for _, ai in engines.values():
+        if isinstance(ai, HardAI) and ai.book is not None:
+            ai.book.close()
+    return winner, stats
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[k]
+
+
+def elo_diff(score):
+    """Elo difference for a score fraction; unbounded (inf) at a 0% or 100% score."""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return 400 * math.log10(score / (1 - score))
+
+
+def score_interval(score, n, z=1.96):
+    """Wilson interval of the score: unlike score +- z*se it does not collapse at 0% or 100%."""
+    d = 1 + z * z / n
+    mid = (score + z * z / (2 * n)) / d
+    half = z * math.sqrt(score * (1 - score) / n + z * z / (4 * n * n)) / d
+    lo = 0.0 if score <= 0 else max(0.0, mid - half)
+    hi = 1.0 if score >= 1 else min(1.0, mid + half)
+    return lo, hi
+
+
+def report(args, results):
+    wins = {"A": 0, "B": 0}
+    draws = 0
+    times = {"A": [], "B": []}
+    nodes = {"A": 0, "B": 0}
+    search_time = {"A": 0.0, "B": 0.0}
+    for winner, stats in results:
+        if winner is None:
+            draws += 1
+        else:
+            wins[winner] += 1
+        for tag in "AB":
+            times[tag].extend(stats[tag]["times"])
+            nodes[tag] += stats[tag]["nodes"]
+            search_time[tag] += stats[tag]["search_time"]
+    n = len(results)
+    print(f"A {args.a}  vs  B {args.b}  ({n} games, {args.jobs} jobs)")
+    print(f"A wins {wins['A']} ({100 * wins['A'] / n:.1f}%)  B wins {wins['B']} ({100 * wins['B'] / n:.1f}%)"
+          f"  draws {draws} ({100 * draws / n:.1f}%)")
+    score = (wins["A"] + draws / 2) / n
+    lo, hi = score_interval(score, n)
+    print(f"Score A {100 * score:.1f}%   Elo A-B {elo_diff(score):+.0f}"
+          f" (95%: {elo_diff(lo):+.0f} .. {elo_diff(hi):+.0f})")
+    print(f"{'':4}{'moves':>8}{'nodes/s':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for tag in "AB":
+        ts = sorted(times[tag])
+        nps = f"{nodes[tag] / search_time[tag]:.0f}" if search_time[tag] and nodes[tag] else "-"
+        print(f"{tag:4}{len(ts):>8}{nps:>10}" + "".join(
+            f"{1000 * percentile(ts, q):>9.1f}" for q in (50, 90, 99, 100)))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Headless AI-vs-AI matches.")
+    parser.add_argument("--a", default="hard", help="engine A spec, e.g. hard:time=0.5,depth=6")
+    parser.add_argument("--b", default="easy", help="engine B spec")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="parallel games")
+    parser.add_argument("--opening", type=int, default=2, help="random stones before the engines play")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        spec_a = parse_spec(args.a)
+        spec_b = parse_spec(args.b)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(play_game, spec_a, spec_b, g % 2 == 0, args.seed * 100_003 + g, args.opening)
+                   for g in range(args.games)]
+        for f in concurrent.futures.as_completed(futures):
+            try:
+                results.append(f.result())
+            except Exception as e:
+                print(f"Lỗi ván đấu: {e}")
+                continue
+            winner, _ = results[-1]
+            print(f"  game {len(results)}/{args.games}: winner {winner or '-'}", flush=True)
+    if results:
+        report(args, results)
+
+
+if __name__ == "__main__":
+    main_cli()